@@ -0,0 +1,227 @@
+"""
+Бюджеты запросов и времени для тестов страниц.
+
+Тест объявляет бюджет маркером — тогда меряется всё тело теста:
+
+    @pytest.mark.budget(queries=6, duplicates=0, wall_ms=500, render_ms=200)
+    def test_index(client, post):
+        client.get('/')
+
+или фикстурой `budget` — тогда только блок внутри with:
+
+    def test_index(client, post, budget):
+        with budget(queries=6, duplicates=0):
+            client.get('/')
+
+Считаются SQL-запросы: всего и повторов (запросы, одинаковые
+с точностью до параметров, — обычно это N+1), время выполнения
+и время рендеринга шаблонов (только верхнего уровня, include
+и extends входят во время родителя). Превышение роняет тест
+с разбором: что превышено, какие запросы повторялись и список
+всех запросов. Лимит, который не указан, не проверяется.
+
+Время зависит от машины, поэтому лимиты по времени проверяются,
+только если задан множитель: `--budget-time-factor=3` или переменная
+окружения BUDGET_TIME_FACTOR=3 ослабляют их втрое, `1` проверяет
+как есть. Без множителя (и при `0`) время не проверяется.
+"""
+import os
+import re
+import time
+from collections import Counter
+
+import pytest
+
+LIMITS = {
+    'queries': 'SQL-запросов',
+    'duplicates': 'повторов запросов',
+    'wall_ms': 'время, мс',
+    'render_ms': 'рендеринг шаблонов, мс',
+}
+TIME_LIMITS = ('wall_ms', 'render_ms')
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDERS = re.compile(r'\(\?(?:\s*,\s*\?)*\)')
+# Длиннее SQL в разборе обрезается
+SQL_WIDTH = 300
+
+
+def shape(sql):
+    """SQL без значений параметров: по нему ищутся повторы."""
+    sql = NUMBER.sub('?', STRING.sub('?', sql))
+    return PLACEHOLDERS.sub('(...)', sql)
+
+
+def shorten(sql):
+    return sql if len(sql) <= SQL_WIDTH else sql[:SQL_WIDTH] + '…'
+
+
+class Budget:
+    """Контекстный менеджер: меряет блок и сверяет его с лимитами."""
+
+    def __init__(self, time_factor=1.0, **limits):
+        unknown = set(limits) - set(LIMITS)
+        if unknown:
+            raise TypeError(
+                'Неизвестные лимиты бюджета: ' + ', '.join(sorted(unknown)))
+        self.limits = {name: value for name, value in limits.items()
+                       if value is not None}
+        for name in TIME_LIMITS:
+            if name not in self.limits:
+                continue
+            if time_factor:
+                self.limits[name] *= time_factor
+            else:
+                del self.limits[name]
+        self.queries = []
+        self.wall_ms = self.render_ms = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.check()
+
+    def start(self):
+        from django.db import connection
+        from django.template.base import Template
+        from django.test.utils import CaptureQueriesContext
+
+        # Без лимитов на запросы тесту не нужен доступ к базе
+        self.capture = None
+        if {'queries', 'duplicates'} & set(self.limits):
+            self.capture = CaptureQueriesContext(connection)
+            self.capture.__enter__()
+        self.template_class = Template
+        self.original_render = Template._render
+        Template._render = self.timed(self.original_render)
+        self.started = time.perf_counter()
+
+    def stop(self, *exc_info):
+        self.wall_ms = (time.perf_counter() - self.started) * 1000
+        self.template_class._render = self.original_render
+        if self.capture is not None:
+            self.capture.__exit__(*(exc_info or (None, None, None)))
+            self.queries = self.capture.captured_queries
+
+    def timed(self, render):
+        budget = self
+        depth = [0]
+
+        def _render(template, context):
+            if depth[0]:
+                return render(template, context)
+            depth[0] += 1
+            started = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                budget.render_ms += (time.perf_counter() - started) * 1000
+                depth[0] -= 1
+        return _render
+
+    def repeated(self):
+        """Повторяющиеся запросы: [(сколько раз, SQL), ...]."""
+        counts = Counter(shape(query['sql']) for query in self.queries)
+        return [(count, sql) for sql, count in counts.most_common()
+                if count > 1]
+
+    def measured(self):
+        return {
+            'queries': len(self.queries),
+            'duplicates': sum(count - 1 for count, _ in self.repeated()),
+            'wall_ms': self.wall_ms,
+            'render_ms': self.render_ms,
+        }
+
+    def overruns(self):
+        measured = self.measured()
+        return [name for name, limit in self.limits.items()
+                if measured[name] > limit]
+
+    def report(self, overruns):
+        measured = self.measured()
+        lines = ['Бюджет превышен:']
+        for name in LIMITS:
+            mark = '  <-- превышено' if name in overruns else ''
+            limit = self.limits.get(name)
+            limit = '—' if limit is None else f'{limit:g}'
+            lines.append(f'  {LIMITS[name]}: {measured[name]:g} '
+                         f'(лимит {limit}){mark}')
+        repeated = self.repeated()
+        if repeated:
+            lines.append('Повторяющиеся запросы:')
+            lines.extend(f'  {count} раз: {shorten(sql)}'
+                         for count, sql in repeated)
+        if self.queries:
+            lines.append('Все запросы:')
+            lines.extend(
+                f'  {number}. [{query["time"]} с] {shorten(query["sql"])}'
+                for number, query in enumerate(self.queries, 1))
+        return '\n'.join(lines)
+
+    def error(self):
+        """Исключение провала теста, если бюджет превышен, иначе None."""
+        overruns = self.overruns()
+        if not overruns:
+            return None
+        return pytest.fail.Exception(self.report(overruns), pytrace=False)
+
+    def check(self):
+        error = self.error()
+        if error is not None:
+            raise error
+
+
+def time_factor(config):
+    factor = config.getoption('budget_time_factor')
+    if factor is None:
+        factor = float(os.environ.get('BUDGET_TIME_FACTOR', 0))
+    return factor
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--budget-time-factor', type=float, default=None,
+        help='Множитель лимитов времени в pytest.mark.budget; без него '
+             'берётся BUDGET_TIME_FACTOR, а без обоих (и при 0) время '
+             'не проверяется')
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'budget(queries, duplicates, wall_ms, render_ms): лимиты '
+        'SQL-запросов и времени на тело теста')
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('budget')
+    if marker is None:
+        yield
+        return
+    budget = Budget(time_factor(item.config), **marker.kwargs)
+    budget.start()
+    outcome = yield
+    budget.stop()
+    # Упавший тест падает со своей ошибкой, бюджет не проверяем
+    error = budget.error() if outcome.excinfo is None else None
+    if error is None:
+        return
+    if hasattr(outcome, 'force_exception'):
+        # pluggy >= 1.1: исключение из старого hookwrapper устарело
+        outcome.force_exception(error)
+    else:
+        raise error
+
+
+@pytest.fixture
+def budget(request):
+    """Фабрика бюджетов для отдельного блока теста."""
+    def declare(**limits):
+        return Budget(time_factor(request.config), **limits)
+    return declare
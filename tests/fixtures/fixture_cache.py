@@ -0,0 +1,17 @@
+import pytest
+from django.test.utils import override_settings
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache(tmp_path_factory):
+    """
+    Тесты пишут в свой временный кэш, а не в кэш сайта,
+    и не запускают фоновую нарезку превью в медиа сайта.
+    Счётчики событий не пишутся в базу посреди замеров запросов.
+    """
+    from yatube.test_runner import isolated_caches
+    location = str(tmp_path_factory.mktemp('cache'))
+    with override_settings(CACHES=isolated_caches(location),
+                           IMAGE_WORKERS=0,
+                           METRICS_FLUSH_INTERVAL=float('inf')):
+        yield location
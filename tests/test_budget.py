@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tests.fixtures.fixture_budget import Budget, shape, time_factor
+
+
+class TestBudget:
+
+    def test_shape_ignores_parameters(self):
+        assert shape("SELECT * FROM t WHERE id = 1 AND name = 'it''s'") == (
+            shape("SELECT * FROM t WHERE id = 25 AND name = 'x'")
+        ), 'Запросы, которые отличаются только параметрами, должны считаться повторами'
+        assert shape('SELECT * FROM t WHERE id IN (1, 2, 3)') == (
+            shape('SELECT * FROM t WHERE id IN (4)')
+        ), 'Списки IN разной длины должны считаться одним запросом'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_overrun_fails_with_breakdown(self, budget, few_posts_with_group):
+        from posts.models import Post
+        with pytest.raises(pytest.fail.Exception) as error:
+            with budget(queries=3, duplicates=0):
+                for post in Post.objects.all()[:5]:
+                    post.author.username
+        report = str(error.value)
+        assert 'SQL-запросов: 6 (лимит 3)  <-- превышено' in report, (
+            'В отчёте должно быть число запросов и превышенный лимит'
+        )
+        assert 'повторов запросов: 4 (лимит 0)  <-- превышено' in report
+        assert '5 раз: SELECT "auth_user"' in report, (
+            'В отчёте должен быть повторяющийся запрос и сколько раз он выполнен'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_within_budget_passes(self, budget, few_posts_with_group):
+        from posts.models import Post
+        with budget(queries=1, duplicates=0, wall_ms=1000) as measured:
+            list(Post.objects.select_related('author')[:5])
+        assert measured.measured()['queries'] == 1
+
+    def test_time_limits_are_opt_in(self, monkeypatch):
+        config = SimpleNamespace(getoption=lambda name: None)
+        monkeypatch.delenv('BUDGET_TIME_FACTOR', raising=False)
+        assert Budget(time_factor(config), wall_ms=1).limits == {}, (
+            'Без множителя лимиты по времени не должны проверяться'
+        )
+        monkeypatch.setenv('BUDGET_TIME_FACTOR', '3')
+        assert Budget(time_factor(config), wall_ms=1).limits == {
+            'wall_ms': 3}, 'Множитель из BUDGET_TIME_FACTOR должен ослаблять лимиты'
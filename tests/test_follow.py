@@ -76,6 +76,7 @@ class TestFollow:
         return response
 
     @pytest.mark.django_db(transaction=True)
+    @pytest.mark.budget(queries=0, wall_ms=500)
     def test_follow_not_auth(self, client, user):
         response = self.check_url(client, '/follow', '/follow/')
         if not(response.status_code in (301, 302) and response.url.startswith('/auth/login')):
@@ -98,7 +99,7 @@ class TestFollow:
             )
 
     @pytest.mark.django_db(transaction=True)
-    def test_follow_auth(self, user_client, user, post):
+    def test_follow_auth(self, user_client, user, post, budget):
         assert user.follower.count() == 0, 'Проверьте, что правильно считается подписки'
         self.check_url(user_client, f'/{post.author.username}/follow', '/<username>/follow/')
         assert user.follower.count() == 0, 'Проверьте, что нельзя подписаться на самого себя'
@@ -132,7 +133,8 @@ class TestFollow:
 
         self.check_url(user_client, f'/{user_2.username}/follow', '/<username>/follow/')
         assert user.follower.count() == 2, 'Проверьте, что вы можете подписаться на пользователя'
-        response = self.check_url(user_client, '/follow', '/follow/')
+        with budget(queries=10, duplicates=0, wall_ms=500, render_ms=200):
+            response = self.check_url(user_client, '/follow', '/follow/')
         assert len(response.context['page']) == 5, (
             'Проверьте, что на странице `/follow/` список статей авторов на которых подписаны'
         )
@@ -6,6 +6,7 @@ pytestmark = [pytest.mark.django_db]
 
 class TestGroupPaginatorView:
 
+    @pytest.mark.budget(queries=4, duplicates=0, wall_ms=1000, render_ms=500)
     def test_group_paginator_view_get(self, client, few_posts_with_group):
         try:
             response = client.get(f'/group/{few_posts_with_group.group.slug}')
@@ -21,6 +22,7 @@ class TestGroupPaginatorView:
             'Проверьте, что переменная `page` на странице `/group/<slug>/` типа `Page`'
         )
 
+    @pytest.mark.budget(queries=4, duplicates=0, wall_ms=500, render_ms=200)
     def test_group_paginator_not_in_context_view(self, client, post_with_group):
         response = client.get(f'/group/{post_with_group.group.slug}/')
         assert response.status_code != 404, 'Страница `/group/<slug>/` не найдена, проверьте этот адрес в *urls.py*'
@@ -28,12 +30,14 @@ class TestGroupPaginatorView:
             'Проверьте, что переменная `paginator` на странице `/group/<slug>/` типа `Paginator`'
         )
 
+    @pytest.mark.budget(queries=4, duplicates=0, wall_ms=500, render_ms=200)
     def test_index_paginator_not_in_view_context(self, client, few_posts_with_group):
         response = client.get('/')
         assert isinstance(response.context['page'].paginator, Paginator), (
             'Проверьте, что переменная `paginator` объекта `page` на странице `/` типа `Paginator`'
         )
 
+    @pytest.mark.budget(queries=4, duplicates=0, wall_ms=500, render_ms=200)
     def test_index_paginator_view(self, client, post_with_group):
         cache.clear()
         response = client.get('/')
@@ -45,12 +49,14 @@ class TestGroupPaginatorView:
             'Проверьте, что переменная `page` на странице `/` типа `Page`'
         )
 
+    @pytest.mark.budget(queries=12, duplicates=0, wall_ms=500, render_ms=200)
     def test_profile_paginator_view(self, client, few_posts_with_group):
         response = client.get(f'/{few_posts_with_group.author.username}/')
         assert isinstance(response.context['page'].paginator, Paginator), (
             'Проверьте, что переменная `paginator` объекта `page` на странице `/<profile>/` типа `Paginator`'
         )
 
+    @pytest.mark.budget(queries=14, duplicates=0, wall_ms=500, render_ms=200)
     def test_follow_paginator_view(self, user_client, user, another_few_posts_with_group_with_follower):
         response = user_client.get('/follow/')
         assert isinstance(response.context['page'].paginator, Paginator), (
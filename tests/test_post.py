@@ -20,6 +20,7 @@ def get_field_context(context, field_type):
 class TestPostView:
 
     @pytest.mark.django_db(transaction=True)
+    @pytest.mark.budget(queries=12, duplicates=0, wall_ms=1000, render_ms=500)
     def test_post_view_get(self, client, post_with_group):
         try:
             response = client.get(f'/{post_with_group.author.username}/{post_with_group.id}')
@@ -80,6 +81,7 @@ class TestPostEditView:
         )
 
     @pytest.mark.django_db(transaction=True)
+    @pytest.mark.budget(queries=7, duplicates=0, wall_ms=1000, render_ms=500)
     def test_post_edit_view_author_get(self, user_client, post_with_group):
         try:
             response = user_client.get(f'/{post_with_group.author.username}/{post_with_group.id}/edit')
@@ -139,6 +141,7 @@ class TestPostEditView:
         return File(file_obj, name=name)
 
     @pytest.mark.django_db(transaction=True)
+    @pytest.mark.budget(queries=30, duplicates=0, wall_ms=2000)
     def test_post_edit_view_author_post(self, mock_media, user_client, post_with_group):
         text = 'Проверка изменения поста!'
         try:
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import search
 from .models import Post, Group
 
 
@@ -13,6 +14,13 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
     # это свойство сработает для всех колонок: где пусто - там будет эта строка
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу, а не LIKE '%...%' по таблице
+        if not search.match_expression(search_term) or not search.usable():
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(pk__in=search.matching(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 
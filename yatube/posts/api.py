@@ -0,0 +1,161 @@
+"""
+JSON API только для чтения: ленты, пост и его комментарии.
+
+Строки выбираются через .values() теми же индексами, что и HTML-ленты,
+и сразу сериализуются: объекты моделей не создаются. Клиент может
+попросить только нужные поля (?fields=id,text,author) — остальные
+не попадают ни в SELECT, ни в ответ. Ленты листаются по курсору
+(?cursor=..., как в HTML), без COUNT и OFFSET. Ответ сжимается gzip,
+если клиент его принимает.
+
+Формат страницы: {"results": [...], "next": курсор или null,
+"previous": курсор или null}.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from .models import Comment, Group, Post
+from .paginator import CursorPaginator
+
+User = get_user_model()
+
+# Поле ответа -> выражение для values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class BadRequest(Exception):
+    pass
+
+
+class RowCursorPaginator(CursorPaginator):
+    """CursorPaginator для строк .values(), а не объектов."""
+
+    def key(self, row):
+        return row[self.date_field], row['id']
+
+
+def api_view(view):
+    """Только GET/HEAD, ответ в JSON, gzip, ошибки запроса — 400."""
+    @wraps(view)
+    @gzip_page
+    @require_safe
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except BadRequest as error:
+            return json_response({'error': str(error)}, status=400)
+        except Http404 as error:
+            return json_response({'error': str(error)}, status=404)
+        return json_response(data)
+    return wrapper
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=, по умолчанию — все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest('Неизвестные поля: ' + ', '.join(unknown))
+    return list(dict.fromkeys(fields))
+
+
+def rows_page(request, queryset, available, date_field):
+    """
+    Страница строк по курсору. Ключ сортировки (date_field, id)
+    выбирается всегда, но в ответ попадает, только если его просили.
+    """
+    fields = requested_fields(request, available)
+    lookups = {available[name] for name in fields}
+    lookups.update((date_field, 'id'))
+    paginator = RowCursorPaginator(
+        queryset.values(*lookups), settings.POSTS_PER_PAGE,
+        date_field=date_field)
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    return {
+        'results': [serialize(row, fields, available) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def serialize(row, fields, available):
+    data = {name: row[available[name]] for name in fields}
+    if data.get('image'):
+        data['image'] = Post.image.field.storage.url(data['image'])
+    elif 'image' in data:
+        data['image'] = None
+    return data
+
+
+def posts_page(request, queryset):
+    return rows_page(request, queryset, POST_FIELDS, 'pub_date')
+
+
+@api_view
+def feed(request):
+    return posts_page(request, Post.objects.feed())
+
+
+@api_view
+def group_feed(request, slug):
+    data = posts_page(request, Post.objects.feed().filter(group__slug=slug))
+    if not data['results'] and not Group.objects.filter(slug=slug).exists():
+        raise Http404('Группа не найдена')
+    return data
+
+
+@api_view
+def profile_feed(request, username):
+    data = posts_page(
+        request, Post.objects.feed().filter(author__username=username))
+    if (not data['results']
+            and not User.objects.filter(username=username).exists()):
+        raise Http404('Пользователь не найден')
+    return data
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in fields}).first()
+    if row is None:
+        raise Http404('Пост не найден')
+    return serialize(row, fields, POST_FIELDS)
+
+
+@api_view
+def post_comments(request, post_id):
+    """Комментарии поста, от новых к старым."""
+    data = rows_page(request, Comment.objects.filter(post_id=post_id),
+                     COMMENT_FIELDS, 'created')
+    if not data['results'] and not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    return data
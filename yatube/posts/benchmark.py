@@ -0,0 +1,454 @@
+"""
+Нагрузочные замеры views yatube.
+
+seed() наполняет базу данными реалистичного объёма: пользователи,
+группы, посты с авторами по степенному закону (немногие пишут
+почти всё), подписки на популярных авторов и комментарии к свежим
+постам. Записи вставляются пачками через bulk_create, без сигналов,
+после чего счётчики и поисковый индекс пересчитываются разом.
+
+run() открывает каждую из страниц SCENARIOS по многу раз — тестовым
+клиентом в том же процессе (client) и по HTTP через настоящий
+WSGI-сервер (wsgi) — и считает перцентили задержки, число запросов
+к базе на один ответ и память процесса (RSS). Результат — словарь,
+который команда bench_views сохраняет в JSON для сравнения прогонов.
+"""
+import itertools
+import os
+import platform
+import random
+import re
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from urllib.request import HTTPErrorProcessor, Request, build_opener
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from . import search
+from .models import Comment, Follow, Group, Post, UserCounter
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+# Пароль всех засеянных пользователей
+PASSWORD = 'bench-password'
+# Показатель степенного закона: чем больше, тем сильнее перекос
+ZIPF_EXPONENT = 1.1
+# За сколько дней разбросаны даты постов
+HISTORY_DAYS = 365
+PERCENTILES = (50, 95, 99)
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def zipf_cum_weights(size):
+    """Накопленные веса для random.choices: i-й элемент ~ 1 / i**s."""
+    return list(itertools.accumulate(
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, size + 1)))
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def own_dates(*fields):
+    """
+    Отключает auto_now_add у полей: засеянным записям нужны
+    даты из прошлого, а не момент вставки.
+    """
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def seed(users, posts, comments, groups, follows, log=print, seed=None):
+    """
+    Засевает базу. follows — среднее число подписок на пользователя,
+    и сами подписки, и авторы постов распределены по степенному закону.
+    """
+    seeder = Seeder(seed)
+    seeder.users(users)
+    log(f'Пользователей: {len(seeder.user_ids)}')
+    if groups:
+        mixer.cycle(groups).blend(Group)
+    log(f'Групп: {Group.objects.count()}')
+    seeder.posts(posts)
+    log(f'Постов: {posts}')
+    seeder.follows(follows)
+    log(f'Подписок: {Follow.objects.count()}')
+    seeder.comments(comments, recent=max(posts // 10, 1))
+    log(f'Комментариев: {comments}')
+    with transaction.atomic():
+        Post.objects.rebuild_counters()
+        UserCounter.objects.rebuild()
+    if search.available():
+        with transaction.atomic():
+            search.create()
+            search.rebuild()
+    log('Счётчики и поисковый индекс пересчитаны')
+
+
+class Seeder:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.now = timezone.now()
+        self.user_ids = []
+
+    def author(self):
+        return self.rng.choices(
+            self.user_ids, cum_weights=self.user_weights)[0]
+
+    def users(self, count):
+        password = make_password(PASSWORD)
+        first = (User.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0) + 1
+        for batch in batched(range(first, first + count)):
+            User.objects.bulk_create(
+                User(username=f'{self.fake.user_name()}_{number}',
+                     first_name=self.fake.first_name(),
+                     last_name=self.fake.last_name(), password=password)
+                for number in batch)
+        self.user_ids = list(User.objects.filter(pk__gte=first).values_list(
+            'pk', flat=True))
+        # Популярность — случайная перестановка, не порядок регистрации
+        self.rng.shuffle(self.user_ids)
+        self.user_weights = zipf_cum_weights(len(self.user_ids))
+
+    def posts(self, count):
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+
+        def group():
+            if group_ids and self.rng.random() < 0.3:
+                return self.rng.choice(group_ids)
+            return None
+
+        with own_dates(Post._meta.get_field('pub_date')):
+            for batch in batched(range(count)):
+                Post.objects.bulk_create(
+                    Post(text=self.fake.paragraph(), author_id=self.author(),
+                         group_id=group(),
+                         pub_date=self.now - timedelta(
+                             seconds=self.rng.random() * HISTORY_DAYS
+                             * 86400))
+                    for _ in batch)
+
+    def follows(self, average):
+        def rows():
+            for user_id in self.user_ids:
+                count = min(int(self.rng.paretovariate(1.5) * average / 3),
+                            len(self.user_ids) - 1)
+                authors = set(self.rng.choices(
+                    self.user_ids, cum_weights=self.user_weights, k=count))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        for batch in batched(rows()):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def comments(self, count, recent):
+        """Комментарии достаются в основном свежим постам."""
+        posts = list(Post.objects.order_by('-pub_date', '-pk').values_list(
+            'pk', 'pub_date')[:recent])
+        if not posts:
+            return
+        weights = zipf_cum_weights(len(posts))
+
+        def row():
+            post_id, pub_date = self.rng.choices(
+                posts, cum_weights=weights)[0]
+            return Comment(
+                text=self.fake.sentence(), post_id=post_id,
+                author_id=self.author(),
+                created=pub_date + (self.now - pub_date) * self.rng.random())
+
+        with own_dates(Comment._meta.get_field('created')):
+            for batch in batched(range(count)):
+                Comment.objects.bulk_create(row() for _ in batch)
+
+
+def percentile(sorted_values, rank):
+    """Перцентиль по ближайшему рангу."""
+    index = max(0, int(round(rank / 100 * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def rss_mb():
+    """Текущий RSS процесса; без /proc — пиковый."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def targets():
+    """Самые «тяжёлые» страницы засеянной базы."""
+    group = Group.objects.annotate(size=Count('posts')).order_by(
+        '-size').first()
+    author = UserCounter.objects.order_by('-posts_count').select_related(
+        'user').first()
+    post = Post.objects.order_by('-comments_count').select_related(
+        'author').first()
+    reader = UserCounter.objects.order_by('-following_count').select_related(
+        'user').first()
+    if None in (group, author, post, reader):
+        raise ValueError('База пуста: сначала засейте её (bench_seed)')
+    return {
+        'group': group, 'author': author.user, 'post': post,
+        'reader': reader.user,
+    }
+
+
+def scenarios(data):
+    """(имя, метод, адрес, данные формы) для каждой страницы."""
+    post = data['post']
+    post_args = [post.author.username, post.pk]
+    return [
+        ('index', 'GET', reverse('posts:index'), None),
+        ('group_posts', 'GET',
+         reverse('posts:groups', args=[data['group'].slug]), None),
+        ('profile', 'GET',
+         reverse('posts:profile', args=[data['author'].username]), None),
+        ('post_view', 'GET', reverse('posts:post', args=post_args), None),
+        ('follow_index', 'GET', reverse('posts:follow_index'), None),
+        ('new_post', 'POST', reverse('posts:new_post'),
+         {'text': 'Пост из нагрузочного замера'}),
+        ('add_comment', 'POST', reverse('posts:add_comment', args=post_args),
+         {'text': 'Комментарий из нагрузочного замера'}),
+    ]
+
+
+class ClientTransport:
+    """Тестовый клиент Django в том же процессе."""
+    name = 'client'
+
+    def __init__(self, user):
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'POST':
+                response = self.client.post(url, data)
+            else:
+                response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(queries)
+
+    def close(self):
+        pass
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class NoRedirects(HTTPErrorProcessor):
+    """Ответы 3xx и 4xx — тоже результат, а не исключение."""
+
+    def http_response(self, request, response):
+        return response
+
+    https_response = http_response
+
+
+class WSGITransport:
+    """
+    Настоящий WSGI-сервер (wsgiref) в потоке этого процесса и HTTP
+    через сокет. Запросы к базе считаются в потоке сервера.
+    """
+    name = 'wsgi'
+
+    def __init__(self, user):
+        self.queries = 0
+        application = get_wsgi_application()
+
+        def counted(environ, start_response):
+            def count(execute, sql, params, many, context):
+                self.queries += 1
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                return application(environ, start_response)
+
+        self.server = make_server('127.0.0.1', 0, counted,
+                                  handler_class=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        self.opener = build_opener(NoRedirects)
+        self.cookies = SimpleCookie()
+        self.csrf_token = None
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            self.cookies.update(client.cookies)
+            # Токен CSRF берётся из формы, как это сделал бы браузер.
+            # Он привязан к cookie и годится для всех POST, поэтому
+            # берётся один раз, а не внутри замеряемых запросов
+            _, page = self.send('GET', reverse('posts:new_post'))
+            token = CSRF_INPUT.search(page.decode())
+            self.csrf_token = token and token.group(1)
+
+    def send(self, method, url, data=None):
+        headers = {'Cookie': '; '.join(
+            f'{name}={morsel.value}' for name, morsel in self.cookies.items())}
+        body = None
+        if data is not None:
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Referer'] = self.base + url
+        response = self.opener.open(Request(
+            self.base + url, data=body, headers=headers, method=method))
+        content = response.read()
+        for header in response.headers.get_all('Set-Cookie') or ():
+            self.cookies.load(header)
+        return response.status, content
+
+    def request(self, method, url, data):
+        if method == 'POST':
+            data = dict(data, csrfmiddlewaretoken=self.csrf_token)
+        self.queries = 0
+        status, _ = self.send(method, url, data)
+        return status, self.queries
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+TRANSPORTS = {
+    transport.name: transport
+    for transport in (ClientTransport, WSGITransport)
+}
+
+
+def measure(transport, scenario, repeat, warmup):
+    name, method, url, data = scenario
+    for _ in range(warmup):
+        transport.request(method, url, data)
+    timings, queries, statuses = [], [], set()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        began = time.perf_counter()
+        status, count = transport.request(method, url, data)
+        timings.append((time.perf_counter() - began) * 1000)
+        queries.append(count)
+        statuses.add(status)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    result = {
+        'scenario': name,
+        'transport': transport.name,
+        'requests': repeat,
+        'statuses': sorted(statuses),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'rps': round(repeat / elapsed, 1),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'max_queries': max(queries),
+        'rss_mb': round(rss_mb(), 1),
+    }
+    for rank in PERCENTILES:
+        result[f'p{rank}_ms'] = round(percentile(timings, rank), 3)
+    return result
+
+
+def run(transports=tuple(TRANSPORTS), only=None, repeat=100, warmup=5,
+        anonymous=False, log=print):
+    """
+    Замеряет сценарии. Страницы, кроме ленты подписок и форм,
+    открываются от имени читателя с наибольшим числом подписок;
+    с anonymous=True — анонимом, через кэш страниц.
+    """
+    data = targets()
+    results = []
+    for transport_name in transports:
+        for scenario in scenarios(data):
+            name, method = scenario[:2]
+            if only and name not in only:
+                continue
+            needs_login = name in ('follow_index', 'new_post', 'add_comment')
+            user = None if anonymous and not needs_login else data['reader']
+            transport = TRANSPORTS[transport_name](user)
+            try:
+                result = measure(transport, scenario, repeat, warmup)
+            finally:
+                transport.close()
+            log(f"{result['transport']:>6} {name:<13} "
+                f"p50 {result['p50_ms']:8.2f} мс  "
+                f"p95 {result['p95_ms']:8.2f} мс  "
+                f"p99 {result['p99_ms']:8.2f} мс  "
+                f"запросов {result['queries_per_request']:6.1f}  "
+                f"RSS {result['rss_mb']:7.1f} МБ")
+            results.append(result)
+    return {
+        'meta': {
+            'time': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'anonymous': anonymous,
+            'repeat': repeat,
+            'rows': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'peak_rss_mb': round(resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        'results': results,
+    }
+
+
+def compare(previous, current):
+    """Строки сравнения p95 и числа запросов с прошлым прогоном."""
+    before = {(row['transport'], row['scenario']): row
+              for row in previous['results']}
+    for row in current['results']:
+        old = before.get((row['transport'], row['scenario']))
+        if old is None:
+            continue
+        change = ((row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+                  if old['p95_ms'] else 0)
+        yield (f"{row['transport']:>6} {row['scenario']:<13} "
+               f"p95 {old['p95_ms']:.2f} -> {row['p95_ms']:.2f} мс "
+               f"({change:+.0f}%), запросов "
+               f"{old['queries_per_request']} -> "
+               f"{row['queries_per_request']}")
@@ -0,0 +1,169 @@
+"""
+Кэш, общий для всех процессов, с защитой от «давки» (cache stampede).
+
+LocMemCache у каждого воркера свой: каждый прогревает свою копию,
+и горячий ключ протухает во всех сразу. SharedFileCache хранит
+записи в файлах, общих для всех воркеров на машине, а get_or_compute
+пересчитывает значение заранее и только в одном процессе:
+
+* вместе со значением хранится, сколько его считали (delta), и когда
+  оно протухнет; чем ближе срок, тем вероятнее читатель возьмётся
+  пересчитать его заранее (probabilistic early expiration, XFetch);
+* пересчитывает только тот, кто взял блокировку через cache.add,
+  остальные пока отдают старое значение;
+* если значения нет совсем, процессы без блокировки недолго ждут,
+  пока его положит владелец блокировки.
+
+get_or_compute работает с любым бэкендом, у которого add атомарен;
+iter_or_compute — то же для многих ключей, прочитанных одним get_many.
+"""
+import math
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+# Сколько живёт блокировка пересчёта, если её владелец упал
+LOCK_TIMEOUT = 30
+# Сколько ждём чужого пересчёта, прежде чем посчитать самим
+LOCK_WAIT = 2
+LOCK_POLL = 0.05
+
+
+class SharedFileCache(FileBasedCache):
+    """
+    FileBasedCache с атомарными add и incr: по ним процессы
+    договариваются о блокировках и ведут общие счётчики.
+    Проверка и запись идут под flock на одном из lock_stripes файлов
+    блокировок: их число постоянно, сколько бы ключей ни было,
+    и удалять их не нужно (удалённый файл под flock ломал бы
+    взаимоисключение).
+    """
+    lock_suffix = '.djlock'
+    lock_stripes = 64
+    # FileBasedCache перечисляет все файлы кэша перед каждой записью,
+    # чтобы решить, не пора ли чистить. При MAX_ENTRIES в десятки
+    # тысяч это дороже самой записи: проверяем не чаще раза в столько с
+    cull_interval = 60
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._culled_at = None
+
+    def _cull(self):
+        now = time.monotonic()
+        if (self._culled_at is not None
+                and now - self._culled_at < self.cull_interval):
+            return
+        self._culled_at = now
+        super()._cull()
+
+    def _lock_path(self, key, version):
+        name = os.path.basename(self._key_to_file(key, version))
+        stripe = int(name[:8], 16) % self.lock_stripes
+        return os.path.join(self._dir, f'stripe-{stripe}{self.lock_suffix}')
+
+    @contextmanager
+    def _locked(self, key, version):
+        self._createdir()
+        with open(self._lock_path(key, version), 'wb') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked(key, version):
+            return super().incr(key, delta, version)
+
+
+def get_cache():
+    return caches[settings.SHARED_CACHE_ALIAS]
+
+
+def get_or_compute(key, compute, timeout, beta=1.0, cache=None,
+                   fresh=None):
+    """
+    Значение по ключу из общего кэша; compute() вызывается в одном
+    процессе, когда значения нет или оно вот-вот протухнет.
+    beta > 1 — пересчитывать раньше, beta < 1 — позже.
+    fresh(value) — False, если значение устарело раньше срока:
+    тогда оно считается промахом.
+    """
+    cache = cache or get_cache()
+    return lookup(cache, key, cache.get(key), compute, timeout, beta, fresh)
+
+
+def iter_or_compute(keys, compute, timeout, beta=1.0, cache=None,
+                    prepare=None):
+    """
+    Значения по ключам по порядку, как у get_or_compute; все ключи
+    читаются одним get_many, compute(key) вызывается для недостающих
+    по мере того, как до них доходит очередь. prepare(missing) сразу
+    получает все ключи, которых нет в кэше, — например, чтобы
+    подтянуть данные для них одним запросом.
+    """
+    cache = cache or get_cache()
+    entries = cache.get_many(keys)
+    if prepare is not None:
+        prepare([key for key in keys if key not in entries])
+    for key in keys:
+        yield lookup(cache, key, entries.get(key),
+                     lambda key=key: compute(key), timeout, beta)
+
+
+def store(key, value, timeout, delta=0.0, cache=None):
+    """
+    Кладёт значение так, как его кладёт get_or_compute;
+    delta — сколько секунд его считали.
+    """
+    cache = cache or get_cache()
+    cache.set(key, (value, delta, time.time() + timeout), timeout)
+
+
+def lookup(cache, key, entry, compute, timeout, beta, fresh=None):
+    lock_key = key + ':lock'
+    if entry is not None and fresh is not None and not fresh(entry[0]):
+        entry = None
+    if entry is not None:
+        value, delta, expiry = entry
+        # 1 - random() лежит в (0, 1], логарифм от нуля не считаем
+        early = delta * beta * -math.log(1 - random.random())
+        if time.time() + early < expiry:
+            return value
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Пересчитывает другой процесс — отдаём пока старое
+            return value
+    elif not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        entry = wait_for(cache, key, fresh)
+        if entry is not None:
+            return entry[0]
+        return compute()
+    try:
+        started = time.time()
+        value = compute()
+        store(key, value, timeout, time.time() - started, cache)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def wait_for(cache, key, fresh=None):
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None and (fresh is None or fresh(entry[0])):
+            return entry
+    return None
@@ -0,0 +1,64 @@
+"""
+ETag для условных запросов к post_view и profile.
+
+Валидатор собирается из того, что и так поддерживается при записи:
+версии постов (растёт при правке, комментарии, переименовании группы)
+и счётчиков автора. Ни шаблон, ни полный контекст для этого не нужны:
+на пост уходит один запрос по первичному ключу, на профиль — выборка
+(pk, version) той же страницы по индексу автора.
+
+В ETag входит и зритель: анониму и автору страница показывается
+по-разному.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .models import Post
+from .paginator import paginate
+
+User = get_user_model()
+
+COUNTER_FIELDS = ('posts_count', 'followers_count', 'following_count')
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def make_etag(request, *parts):
+    viewer = request.user.pk if request.user.is_authenticated else ''
+    raw = repr((viewer,) + parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def post_etag(request, username, post_id):
+    row = Post.objects.filter(
+        pk=post_id, author__username=username).values_list(
+        'version', *('author__' + field for field in AUTHOR_FIELDS),
+        *('author__counter__' + field for field in COUNTER_FIELDS),
+    ).first()
+    if row is None:
+        return None
+    # Токен формы комментария должен совпадать с cookie клиента
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    return make_etag(request, row, csrf, request.GET.get('cursor'))
+
+
+def profile_etag(request, username):
+    posts = Post.objects.filter(author__username=username).select_related(
+        'author__counter').only(
+        'pk', 'version', 'pub_date',
+        *('author__' + field for field in AUTHOR_FIELDS),
+        *('author__counter__' + field for field in COUNTER_FIELDS))
+    page = paginate(request, posts)
+    if page:
+        author = page[0].author
+    else:
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            return None
+    # Строки счётчика может ещё не быть: её создаст сам profile
+    counter = getattr(author, 'counter', None)
+    return make_etag(
+        request, [getattr(author, field) for field in AUTHOR_FIELDS],
+        counter and counter.posts_count,
+        [(post.pk, post.version) for post in page])
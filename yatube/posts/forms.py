@@ -1,4 +1,6 @@
 from .models import Post, Comment
+from .uploads import RejectedUpload, check_dimensions, shrink
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm, Textarea
 from django.utils.translation import gettext_lazy as _
 
@@ -23,6 +25,32 @@ class PostForm(ModelForm):
         }
         error_massages = {'text': {'required': _('Заполните поле')}}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы, отвергнутые ещё при загрузке (posts.uploads)
+        self.rejected = {}
+        if self.files:
+            self.files = self.files.copy()
+            for name, upload in list(self.files.items()):
+                if isinstance(upload, RejectedUpload):
+                    self.rejected[name] = self.files.pop(name)[0]
+
+    def clean(self):
+        for name, upload in self.rejected.items():
+            self.add_error(name, upload.reason)
+        return super().clean()
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # У только что загруженного файла Pillow уже прочёл заголовок
+        header = getattr(image, 'image', None)
+        if header is None:
+            return image
+        error = check_dimensions(header)
+        if error:
+            raise ValidationError(error)
+        return shrink(image, header)
+
 
 class CommentForm(ModelForm):
     class Meta:
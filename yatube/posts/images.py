@@ -0,0 +1,253 @@
+"""
+Превью картинок постов, нарезанные заранее.
+
+Раньше {% thumbnail %} резал картинку при первой отрисовке страницы,
+и запрос ждал декодирования и ресайза. Теперь сохранение поста
+с картинкой только ставит задание в очередь (ImageJob), а превью
+(Rendition) режут обработчики в фоне:
+
+* в веб-процессе — пул из IMAGE_WORKERS потоков, который будится
+  после коммита транзакции с новым заданием;
+* отдельно — команда process_images, которая разбирает очередь,
+  оставшуюся после перезапуска, или работает вместо пула.
+
+Пока превью нет, шаблон показывает заглушку. Готовое превью растит
+версию поста, и закэшированные карточки и страницы перерисовываются.
+"""
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import ImageJob, Post, Rendition
+
+# Размеры превью: имя -> (ширина, высота), картинка обрезается по центру
+RENDITIONS = {
+    'card': (960, 339),
+}
+# Каждое превью режется ещё и в меньших ширинах — для srcset
+WIDTHS = (320, 640, 960)
+# Формат -> (формат PIL, параметры сохранения). WebP идёт рядом с JPEG,
+# если Pillow собран с его поддержкой
+FORMATS = {
+    Rendition.JPEG: ('JPEG', {'quality': 85, 'optimize': True,
+                              'progressive': True}),
+}
+if features.check('webp'):
+    FORMATS[Rendition.WEBP] = ('WEBP', {'quality': 80, 'method': 4})
+BACKGROUND = (255, 255, 255)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def enqueue(post):
+    """Ставит в очередь нарезку превью, если их ещё нет."""
+    if not post.image:
+        return None
+    name = post.image.name
+    if (Rendition.objects.filter(post=post, image=name).count()
+            >= rendition_count()
+            or ImageJob.objects.filter(
+                post=post, image=name,
+                status__in=(ImageJob.PENDING, ImageJob.RUNNING)).exists()
+            or reuse(post)):
+        return None
+    job = ImageJob.objects.create(post=post, image=name)
+    transaction.on_commit(kick)
+    return job
+
+
+def rendition_count():
+    """Сколько превью нарезается из одной картинки."""
+    return len(FORMATS) * sum(
+        len(widths(size)) for size in RENDITIONS.values())
+
+
+def reuse(post):
+    """
+    Та же картинка уже есть у другого поста (хранилище не хранит
+    дублей): его превью копируются в пост, а не режутся заново.
+    """
+    found = defaultdict(list)
+    for rendition in Rendition.objects.filter(
+            image=post.image.name).exclude(post=post):
+        found[rendition.post_id].append(rendition)
+    donors = [renditions for renditions in found.values()
+              if len(renditions) >= rendition_count()]
+    if not donors:
+        return False
+    with transaction.atomic():
+        Rendition.objects.filter(post=post).delete()
+        Rendition.objects.bulk_create([
+            Rendition(post=post, image=r.image, name=r.name,
+                      file=r.file.name, format=r.format,
+                      width=r.width, height=r.height)
+            for r in donors[0]])
+        Post.objects.filter(pk=post.pk).update(version=F('version') + 1)
+    return True
+
+
+def attach_renditions(posts):
+    """
+    Подтягивает превью всех постов страницы одним запросом
+    и кладёт их в post.page_renditions: {% post_image %} тогда
+    не ходит в базу за каждой карточкой.
+    """
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    found = defaultdict(list)
+    for rendition in Rendition.objects.filter(post__in=posts):
+        found[rendition.post_id].append(rendition)
+    for post in posts:
+        post.page_renditions = [
+            rendition for rendition in found[post.pk]
+            if rendition.image == post.image.name]
+
+
+def enqueue_missing():
+    """Ставит в очередь посты с картинками, у которых нет превью."""
+    posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+    return sum(enqueue(post) is not None for post in posts.iterator())
+
+
+def kick():
+    """Будит пул обработчиков веб-процесса."""
+    global _pool
+    if not settings.IMAGE_WORKERS:
+        return
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(settings.IMAGE_WORKERS,
+                                       thread_name_prefix='images')
+    _pool.submit(drain_in_thread)
+
+
+def drain_in_thread():
+    try:
+        return drain()
+    finally:
+        # Соединения с базой у каждого потока свои
+        connections.close_all()
+
+
+def requeue_stale():
+    """Возвращает в очередь задания упавших обработчиков."""
+    deadline = timezone.now() - timedelta(seconds=settings.IMAGE_JOB_TIMEOUT)
+    stale = ImageJob.objects.filter(status=ImageJob.RUNNING,
+                                    started__lt=deadline)
+    stale.filter(attempts__gte=settings.IMAGE_JOB_ATTEMPTS).update(
+        status=ImageJob.FAILED, error='Обработчик не ответил')
+    return stale.update(status=ImageJob.PENDING)
+
+
+def claim():
+    """
+    Забирает самое старое задание из очереди. Обработчики не мешают
+    друг другу: задание достаётся тому, чей UPDATE его изменил.
+    """
+    queue = ImageJob.objects.filter(status=ImageJob.PENDING)
+    while True:
+        job = queue.first()
+        if job is None:
+            return None
+        taken = queue.filter(pk=job.pk).update(
+            status=ImageJob.RUNNING, started=timezone.now(),
+            attempts=F('attempts') + 1)
+        if taken:
+            job.status = ImageJob.RUNNING
+            job.attempts += 1
+            return job
+
+
+def drain(limit=None):
+    """Разбирает очередь; возвращает, сколько заданий обработано."""
+    requeue_stale()
+    done = 0
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            break
+        process(job)
+        done += 1
+    return done
+
+
+def process(job):
+    post = Post.objects.filter(pk=job.post_id).first()
+    try:
+        # Картинку поста могли заменить, пока задание ждало
+        if post is not None and post.image.name == job.image:
+            render(post)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        failed = job.attempts >= settings.IMAGE_JOB_ATTEMPTS
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.FAILED if failed else ImageJob.PENDING,
+            error=str(error))
+        return False
+    ImageJob.objects.filter(pk=job.pk).update(
+        status=ImageJob.DONE, error='')
+    return True
+
+
+def render(post):
+    """Нарезает все превью картинки поста и заменяет ими старые."""
+    with post.image.open('rb') as source:
+        image = flatten(ImageOps.exif_transpose(Image.open(source)))
+    renditions = []
+    for name, size in RENDITIONS.items():
+        fitted = ImageOps.fit(image, size, Image.LANCZOS)
+        for width in widths(size):
+            height = round(size[1] * width / size[0])
+            resized = (fitted if width == size[0]
+                       else fitted.resize((width, height), Image.LANCZOS))
+            for image_format, (pil_format, params) in FORMATS.items():
+                renditions.append(save_rendition(
+                    post, name, resized, image_format, pil_format, params))
+    with transaction.atomic():
+        stale = list(Rendition.objects.filter(post=post))
+        Rendition.objects.filter(pk__in=[r.pk for r in stale]).delete()
+        Rendition.objects.bulk_create(renditions)
+        Post.objects.filter(pk=post.pk).update(version=F('version') + 1)
+    # Файлы превью бывают общими у постов с одной картинкой
+    shared = set(Rendition.objects.filter(
+        file__in=[r.file.name for r in stale]).values_list('file', flat=True))
+    for rendition in stale:
+        if rendition.file.name not in shared:
+            rendition.file.delete(save=False)
+    return renditions
+
+
+def widths(size):
+    """Ширины, в которых режется превью размера size."""
+    return [width for width in WIDTHS if width < size[0]] + [size[0]]
+
+
+def save_rendition(post, name, image, image_format, pil_format, params):
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **params)
+    rendition = Rendition(post=post, image=post.image.name, name=name,
+                          format=image_format,
+                          width=image.width, height=image.height)
+    rendition.file.save(f'{post.pk}_{name}_{image.width}.{image_format}',
+                        ContentFile(buffer.getvalue()), save=False)
+    return rendition
+
+
+def flatten(image):
+    """Картинка в RGB; прозрачные места заливаются белым."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, BACKGROUND)
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from posts import views
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замеряет post_view на засеянной базе: число запросов '
+            'и время ответа. Засеянные данные откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=1000,
+                            help='Сколько комментариев у поста')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Сколько раз открыть страницу поста')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['comments'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, comments, repeat):
+        post = self.seed(comments)
+        request = RequestFactory().get(
+            f'/{post.author.username}/{post.pk}/')
+        request.user = AnonymousUser()
+
+        def view():
+            return views.post_view(request, post.author.username, post.pk)
+
+        view()
+        with CaptureQueriesContext(connection) as queries:
+            view()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            view()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f'Комментариев: {comments}, запросов: {len(queries)}, '
+            f'медиана: {statistics.median(timings):.2f} мс, '
+            f'p95: {p95:.2f} мс')
+
+    def seed(self, comments):
+        author = User.objects.create_user(username='bench_author')
+        User.objects.bulk_create(
+            User(username=f'bench_reader_{number}') for number in range(50))
+        # bulk_create в SQLite не возвращает pk: перечитываем
+        readers = list(User.objects.filter(
+            username__startswith='bench_reader_'))
+        group = Group.objects.create(title='Замеры', slug='bench-group')
+        post = Post.objects.create(text='Пост для замеров', author=author,
+                                   group=group)
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {number}', post=post,
+                    author=readers[number % len(readers)])
+            for number in range(comments))
+        return post
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Засевает базу данными для нагрузочных замеров. '
+            'Запускайте на отдельной копии базы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=5_000_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument('--follows', type=int, default=30,
+                            help='Среднее число подписок на пользователя')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора, для повторяемых данных')
+
+    def handle(self, *args, **options):
+        benchmark.seed(
+            options['users'], options['posts'], options['comments'],
+            options['groups'], options['follows'], log=self.stdout.write,
+            seed=options['seed'])
+        self.stdout.write(self.style.SUCCESS('База засеяна'))
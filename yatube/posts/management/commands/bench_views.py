@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов к базе и память на '
+            'основных страницах; результат сохраняется в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Сколько раз открыть каждую страницу')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--transport', action='append',
+                            choices=sorted(benchmark.TRANSPORTS),
+                            help='client, wsgi или оба (по умолчанию)')
+        parser.add_argument('--only', action='append',
+                            help='Замерить только эти сценарии')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Открывать ленты и посты анонимом')
+        parser.add_argument('--output', help='Куда сохранить JSON')
+        parser.add_argument('--compare',
+                            help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        try:
+            report = benchmark.run(
+                transports=options['transport'] or tuple(
+                    benchmark.TRANSPORTS),
+                only=options['only'], repeat=options['requests'],
+                warmup=options['warmup'], anonymous=options['anonymous'],
+                log=self.stdout.write)
+        except ValueError as error:
+            raise CommandError(error)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты: {options['output']}")
+        if options['compare']:
+            with open(options['compare']) as previous:
+                for line in benchmark.compare(json.load(previous), report):
+                    self.stdout.write(line)
@@ -0,0 +1,76 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, Rendition, StoredFile
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки постов и превью, на которые больше '
+            'никто не ссылается')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=24 * 60 * 60,
+                            help='Не трогать файлы моложе стольких секунд: '
+                                 'их пост могли ещё не сохранить')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.deadline = time.time() - options['grace']
+        storage = Post._meta.get_field('image').storage
+        with transaction.atomic():
+            StoredFile.objects.rebuild()
+        referenced = set(Post.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('image', flat=True))
+        tracked = set(StoredFile.objects.values_list('name', flat=True))
+        images = self.collect(storage, 'posts', referenced,
+                              self.release_image)
+        renditions = set(Rendition.objects.values_list('file', flat=True))
+        thumbs = self.collect(
+            Rendition._meta.get_field('file').storage, 'renditions',
+            renditions,
+            lambda name: not Rendition.objects.filter(file=name).exists())
+        untracked = len(set(images) - tracked)
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок удалено: {len(images)} (без учёта: {untracked}), '
+            f'превью: {len(thumbs)}'
+            + (' — пробный запуск' if self.dry_run else '')))
+
+    def release_image(self, name):
+        """
+        Снимает файл с учёта, прежде чем удалить: хранилище
+        перестаёт выдавать его новым постам как дубль.
+        """
+        StoredFile.objects.filter(name=name, refcount=0).delete()
+        return not Post.objects.filter(image=name).exists()
+
+    def collect(self, storage, directory, referenced, unused):
+        """
+        Удаляет старые файлы каталога, которых нет в referenced;
+        перед удалением unused(name) перепроверяет файл в базе.
+        """
+        orphans = []
+        for name in self.walk(storage, directory):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name).timestamp() > self.deadline:
+                continue
+            if self.dry_run:
+                orphans.append(name)
+            elif unused(name):
+                storage.delete(name)
+                orphans.append(name)
+        return orphans
+
+    def walk(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        dirs, files = storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name).replace(os.sep, '/')
+        for sub in dirs:
+            yield from self.walk(storage, os.path.join(directory, sub))
@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = 'Нарезает превью картинок постов из очереди заданий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.IMAGE_WORKERS or 1,
+                            help='Сколько обработчиков запустить')
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать очередь и выйти')
+        parser.add_argument('--missing', action='store_true',
+                            help='Сначала поставить в очередь картинки '
+                                 'старых постов без превью')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза между проверками пустой очереди')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        if options['missing']:
+            self.stdout.write(
+                f'Поставлено в очередь: {images.enqueue_missing()}')
+        total = 0
+        with ThreadPoolExecutor(workers) as pool:
+            while True:
+                done = sum(pool.map(
+                    lambda _: images.drain_in_thread(), range(workers)))
+                total += done
+                if options['once']:
+                    break
+                if not done:
+                    time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано заданий: {total}'))
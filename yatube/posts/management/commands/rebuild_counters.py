@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, UserCounter
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок с нуля'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts = Post.objects.rebuild_counters()
+            users = UserCounter.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, пользователей: {users}'))
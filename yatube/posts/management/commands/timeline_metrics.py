@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import metrics
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько постов ленты подписок отдал каждый путь'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить счётчики после вывода')
+
+    def handle(self, *args, **options):
+        values = metrics.get(metrics.TIMELINE)
+        total = sum(values.values())
+        for name, value in values.items():
+            share = value / total * 100 if total else 0
+            self.stdout.write(f'{name}: {value} ({share:.1f}%)')
+        if options['reset']:
+            metrics.reset(metrics.TIMELINE)
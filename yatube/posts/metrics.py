@@ -0,0 +1,82 @@
+"""
+Простые счётчики событий.
+
+Значения хранятся в базе (Metric), а не в кэше: кэш вытесняет
+записи, и счёт терялся бы. Чтобы не писать в базу на каждый запрос,
+процесс копит приращения в памяти и сбрасывает их одним UPDATE
+на счётчик не чаще раза в METRICS_FLUSH_INTERVAL секунд. Поэтому
+чужие процессы видят свежие приращения с этой задержкой; get
+и reset сначала сбрасывают приращения своего процесса.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Metric
+
+# Откуда пришли посты ленты подписок
+PUSH = 'timeline.push'
+PULL = 'timeline.pull'
+JOIN = 'timeline.join'
+TIMELINE = (PUSH, PULL, JOIN)
+
+pending = Counter()
+lock = threading.Lock()
+flushed_at = time.monotonic()
+
+
+def incr(name, delta=1):
+    record({name: delta})
+
+
+def incr_many(names):
+    record(Counter(names))
+
+
+def record(deltas):
+    with lock:
+        pending.update(deltas)
+        due = (time.monotonic() - flushed_at
+               >= settings.METRICS_FLUSH_INTERVAL)
+    if due:
+        flush()
+
+
+def flush():
+    """Переносит накопленные приращения процесса в базу."""
+    global flushed_at
+    with lock:
+        deltas = dict(pending)
+        pending.clear()
+        flushed_at = time.monotonic()
+    for name, delta in deltas.items():
+        add(name, delta)
+
+
+def add(name, delta):
+    if Metric.objects.filter(name=name).update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            Metric.objects.create(name=name, value=delta)
+    except IntegrityError:
+        # Строку успел создать другой процесс
+        Metric.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def get(names):
+    flush()
+    values = dict(Metric.objects.filter(name__in=names).values_list(
+        'name', 'value'))
+    return {name: values.get(name, 0) for name in names}
+
+
+def reset(names):
+    with lock:
+        for name in names:
+            pending.pop(name, None)
+    Metric.objects.filter(name__in=names).delete()
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_image_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='rendition',
+            options={'ordering': ['width'], 'verbose_name': 'Превью', 'verbose_name_plural': 'Превью'},
+        ),
+        migrations.RemoveConstraint(
+            model_name='rendition',
+            name='unique_rendition',
+        ),
+        migrations.AddField(
+            model_name='rendition',
+            name='format',
+            field=models.CharField(choices=[('jpeg', 'JPEG'), ('webp', 'WebP')], default='jpeg', max_length=10, verbose_name='Формат'),
+        ),
+        migrations.AddConstraint(
+            model_name='rendition',
+            constraint=models.UniqueConstraint(fields=('post', 'image', 'name', 'format', 'width'), name='unique_rendition_size'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# SQL записан здесь, а не взят из posts.search: миграция не должна
+# меняться вместе с живым кодом. Индекс заполняет rebuild_search.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+    "text, comments, group_title, "
+    "tokenize = 'unicode61 remove_diacritics 2')")
+DROP_SQL = 'DROP TABLE IF EXISTS posts_search'
+
+
+def run_on_sqlite(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_stored_files'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL),
+                             run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+# Индекс теперь хранит термы (основы слов), а не исходный текст.
+# Строки в старом виде удаляются; заново индекс один раз заполняет
+# manage.py rebuild_search тем анализатором, что есть в коде сейчас.
+CLEAR_SQL = 'DELETE FROM posts_search'
+
+
+def clear_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CLEAR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_index, clear_index),
+    ]
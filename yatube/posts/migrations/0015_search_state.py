@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# SQL записан здесь, а не взят из posts.search: миграция не должна
+# меняться вместе с живым кодом. В posts_search_state rebuild_search
+# записывает версию анализатора, которым собран индекс; пока записи
+# нет, поиск идёт без индекса. Индекс пустой базы собирать нечем:
+# он сразу отмечается собранным анализатором версии 1.
+CREATE_SQL = (
+    'CREATE TABLE IF NOT EXISTS posts_search_state '
+    '(analyzer integer NOT NULL)')
+DROP_SQL = 'DROP TABLE IF EXISTS posts_search_state'
+
+
+def create_state(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM posts_post LIMIT 1')
+        if cursor.fetchone() is None:
+            cursor.execute(
+                'INSERT INTO posts_search_state (analyzer) VALUES (1)')
+
+
+def drop_state(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_state, drop_state),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from pytils.translit import slugify
 
+from .storage import DeduplicatingStorage
+
 User = get_user_model()
 
 
@@ -27,7 +31,31 @@ class Group(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)[:100]
+        renamed = self.pk and Group.objects.filter(pk=self.pk).exclude(
+            title=self.title, slug=self.slug).exists()
         super().save(*args, **kwargs)
+        if renamed:
+            # Название и адрес группы есть в карточках её постов
+            self.posts.update(version=models.F('version') + 1)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """
+        Посты для лент: автор и группа подтягиваются тем же запросом,
+        число комментариев хранится в самом посте (comments_count).
+        """
+        return self.select_related('author', 'group')
+
+    def rebuild_counters(self):
+        """Пересчитывает comments_count одним UPDATE по всей выборке."""
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')).order_by().values('post').annotate(
+            count=Count('pk')).values('count')
+        return self.update(
+            comments_count=Coalesce(
+                Subquery(comments, output_field=IntegerField()), 0),
+            version=models.F('version') + 1)
 
 
 class Post(models.Model):
@@ -49,16 +77,46 @@ class Post(models.Model):
                               verbose_name='Группа публикации',
                               help_text='Сообщество',
                               related_name='posts')
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              storage=DeduplicatingStorage())
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев')
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия',
+        help_text='Растёт при каждом изменении карточки поста')
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
-        ordering = ['-pub_date', 'text'][:10]
+        ordering = ['-pub_date', '-id']
+        # Индексы под ленты: общая, автора и группы
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_feed_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_feed_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_feed_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Новая версия сбрасывает закэшированную карточку поста.
+        # Версию в памяти могли обогнать комментарии: растим её в базе
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -83,7 +141,11 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ['-created', 'text'][:10]
+        ordering = ['-created', '-id']
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_feed_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -106,7 +168,12 @@ class Follow (models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
-        ordering = ['-author'][:10]
+        ordering = ['-author']
+        # Поиск подписчиков автора: user_id берётся прямо из индекса
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],
@@ -115,3 +182,283 @@ class Follow (models.Model):
 
     def __str__(self):
         return self.author[:15]
+
+
+class UserCounterManager(models.Manager):
+    def for_user(self, user):
+        """
+        Счётчики пользователя. Если строки ещё нет,
+        она создаётся с посчитанными с нуля значениями.
+        """
+        try:
+            return self.get(user=user)
+        except self.model.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                return self.create(user=user, **self.model.count_for(user))
+        except IntegrityError:
+            # Строку успел создать параллельный запрос
+            return self.get(user=user)
+
+    def bump(self, user_id, field, delta):
+        """
+        Атомарно сдвигает счётчик пользователя на delta.
+        Если строки ещё нет, её посчитает с нуля for_user при чтении.
+        """
+        if user_id is not None:
+            self.filter(user_id=user_id).update(
+                **{field: models.F(field) + delta})
+
+    def rebuild(self):
+        """Пересчитывает счётчики всех пользователей пачкой запросов."""
+        missing = User.objects.filter(counter__isnull=True)
+        self.bulk_create(
+            [self.model(user_id=pk)
+             for pk in missing.values_list('pk', flat=True)],
+            batch_size=500)
+
+        def count(model, field):
+            rows = model.objects.filter(
+                **{field: OuterRef('user')}).order_by().values(
+                field).annotate(count=Count('pk')).values('count')
+            return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+        return self.update(
+            posts_count=count(Post, 'author'),
+            followers_count=count(Follow, 'author'),
+            following_count=count(Follow, 'user'),
+        )
+
+
+class UserCounter(models.Model):
+    """Денормализованные счётчики пользователя для профиля и поста."""
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                verbose_name='Пользователь',
+                                related_name='counter')
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Записей')
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок')
+
+    objects = UserCounterManager()
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+    @staticmethod
+    def count_for(user):
+        return {
+            'posts_count': Post.objects.filter(author=user).count(),
+            'followers_count': Follow.objects.filter(author=user).count(),
+            'following_count': Follow.objects.filter(user=user).count(),
+        }
+
+
+class Timeline(models.Model):
+    """
+    Отметка о том, что лента подписок пользователя материализована
+    в TimelineEntry. Для «холодных» пользователей без отметки лента
+    собирается запросом через Follow.
+    """
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                verbose_name='Читатель',
+                                related_name='timeline')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата сборки')
+    truncated = models.BooleanField(
+        default=False,
+        verbose_name='Обрезана',
+        help_text='В ленте есть не все посты: старые дочитываются '
+                  'запросом через Follow')
+
+    class Meta:
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    """Пост автора в готовой ленте подписчика (fan-out on write)."""
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             verbose_name='Читатель',
+                             related_name='timeline_entries')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             verbose_name='Пост',
+                             related_name='timeline_entries')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               verbose_name='Автор',
+                               related_name='+')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        ordering = ['-pub_date', '-post']
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_feed_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_post')
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class ImageJob(models.Model):
+    """
+    Задание нарезать превью картинки поста. Очередь хранится в базе,
+    поэтому переживает перезапуск: задания, взятые упавшим
+    обработчиком, возвращаются в очередь (posts.images).
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Обрабатывается'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             verbose_name='Пост',
+                             related_name='image_jobs')
+    image = models.CharField(max_length=100, verbose_name='Картинка')
+    status = models.CharField(max_length=10,
+                              choices=STATUSES,
+                              default=PENDING,
+                              verbose_name='Состояние')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата постановки')
+    started = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Дата начала')
+
+    class Meta:
+        verbose_name = 'Задание на превью'
+        verbose_name_plural = 'Задания на превью'
+        ordering = ['created', 'id']
+        indexes = [
+            models.Index(fields=['status', 'created', 'id'],
+                         name='imagejob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.image} ({self.status})'
+
+
+class Rendition(models.Model):
+    """
+    Готовое превью картинки поста. Одно превью нарезается в нескольких
+    ширинах и форматах, из них шаблон собирает srcset.
+    """
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+    FORMATS = (
+        (JPEG, 'JPEG'),
+        (WEBP, 'WebP'),
+    )
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             verbose_name='Пост',
+                             related_name='renditions')
+    image = models.CharField(max_length=100,
+                             verbose_name='Исходная картинка')
+    name = models.CharField(max_length=20, verbose_name='Размер')
+    file = models.FileField(upload_to='renditions/', verbose_name='Файл')
+    format = models.CharField(max_length=10,
+                              choices=FORMATS,
+                              default=JPEG,
+                              verbose_name='Формат')
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+
+    class Meta:
+        verbose_name = 'Превью'
+        verbose_name_plural = 'Превью'
+        ordering = ['width']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'image', 'name', 'format', 'width'],
+                name='unique_rendition_size')
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.name} {self.width}w.{self.format}'
+
+    @property
+    def mime_type(self):
+        return f'image/{self.format}'
+
+
+class StoredFileManager(models.Manager):
+    def rebuild(self):
+        """Пересчитывает, сколько постов ссылается на каждый файл."""
+        refs = Post.objects.filter(image=OuterRef('name')).order_by().values(
+            'image').annotate(count=Count('pk')).values('count')
+        return self.update(refcount=Coalesce(
+            Subquery(refs, output_field=IntegerField()), 0))
+
+
+class StoredFile(models.Model):
+    """
+    Уникальное содержимое картинки в хранилище постов
+    (posts.storage.DeduplicatingStorage) и число постов с ним.
+    """
+    digest = models.CharField(max_length=64, unique=True,
+                              verbose_name='SHA-256')
+    name = models.CharField(max_length=100, unique=True,
+                            verbose_name='Файл')
+    size = models.PositiveIntegerField(verbose_name='Размер')
+    refcount = models.PositiveIntegerField(default=0,
+                                           verbose_name='Ссылок')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата загрузки')
+
+    objects = StoredFileManager()
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class Metric(models.Model):
+    """Счётчик событий (posts.metrics): имя и накопленное значение."""
+    name = models.CharField(max_length=100, primary_key=True,
+                            verbose_name='Имя')
+    value = models.BigIntegerField(default=0, verbose_name='Значение')
+
+    class Meta:
+        verbose_name = 'Счётчик событий'
+        verbose_name_plural = 'Счётчики событий'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
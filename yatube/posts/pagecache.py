@@ -0,0 +1,213 @@
+"""
+Кэш целых страниц index и group для анонимных посетителей.
+
+Ответ хранится в общем кэше под ключом из области (лента, группа),
+её поколения и позиции страницы (?page=N или ?cursor=...).
+Сбрасывается кэш событиями, а не по сроку жизни:
+
+* новый или удалённый пост сдвигает все страницы ленты, поэтому
+  поколение области (index и группа поста) меняется, и старые
+  ключи больше никто не читает;
+* правка поста или комментарий меняют только его карточку и растят
+  Post.version: вместе со страницей запоминаются версии её постов,
+  и страница, где версия хоть одного поста с тех пор сменилась,
+  рендерится заново. Сверка стоит одного запроса по первичному ключу.
+
+Поколения областей — случайные метки, а не счётчики: областей мало
+(лента и группы), и если кэш вытеснит метку, вместо неё заводится
+новая — старые страницы станут промахом, а не вернутся устаревшими.
+
+Промахи идут через posts.caching.get_or_compute: страницу рисует
+один процесс, остальные ждут её или отдают прежнюю.
+
+Ответы отдаются с ETag и Last-Modified, поэтому клиенты и прокси
+проверяют их условным запросом и получают 304.
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from .caching import get_cache, get_or_compute, store
+from .models import Group, Post
+
+INDEX = 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def scope_key(scope):
+    return f'pagecache:scope:{scope}'
+
+
+def new_generation():
+    return uuid.uuid4().hex
+
+
+def bump(keys):
+    """Новое поколение: оно не совпадёт ни с одним прежним."""
+    get_cache().set_many(
+        {key: new_generation() for key in keys}, None)
+
+
+def current(keys):
+    """Поколения по ключам; для ключей без поколения оно заводится."""
+    cache = get_cache()
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, new_generation(), None)
+            found[key] = cache.get(key)
+    return found
+
+
+def scope_generation(scope):
+    key = scope_key(scope)
+    return current([key])[key]
+
+
+def purge_scopes(*scopes):
+    """Сбрасывает все страницы областей: ленты сдвинулись."""
+    bump(scope_key(scope) for scope in scopes)
+
+
+def post_scopes(post):
+    if post.group_id:
+        return INDEX, group_scope(post.group.slug)
+    return INDEX,
+
+
+def group_header(slug):
+    """
+    Группа с числом постов (posts_count) для шапки её ленты.
+    Ключ включает поколение области группы, поэтому шапка
+    сбрасывается теми же событиями, что и страницы группы.
+    """
+    generation = scope_generation(group_scope(slug))
+    return get_or_compute(
+        f'pagecache:group:{slug}:{generation}',
+        lambda: get_object_or_404(
+            Group.objects.annotate(posts_count=Count('posts')), slug=slug),
+        settings.PAGE_CACHE_TIMEOUT)
+
+
+def page_key(scope, generation, request):
+    position = (request.GET.get('cursor', '')
+                if 'cursor' in request.GET or 'page' not in request.GET
+                else 'page=' + request.GET.get('page', ''))
+    digest = hashlib.md5(position.encode()).hexdigest()
+    return f'pagecache:page:{scope}:{generation}:{digest}'
+
+
+def tag_posts(response, posts):
+    """
+    Отмечает, какие посты показаны в ответе. Страница может быть
+    ленивой: посты читаются, когда ответ уже отрисован.
+    """
+    response.page_posts = posts
+    return response
+
+
+def versions(post_ids):
+    """Текущие версии постов: {pk: version}, удалённых в нём нет."""
+    if not post_ids:
+        return {}
+    return dict(Post.objects.filter(pk__in=post_ids).order_by().values_list(
+        'pk', 'version'))
+
+
+class Uncached(Exception):
+    """Ответ view, который не кладётся в кэш через get_or_compute."""
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+
+def is_fresh(entry):
+    """С тех пор не сменилась версия ни одного поста страницы."""
+    return versions(list(entry['posts'])) == entry['posts']
+
+
+def make_entry(response, content):
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'etag': quote_etag(hashlib.md5(content).hexdigest()),
+        'last_modified': int(time.time()),
+        'posts': {post.pk: post.version for post in response.page_posts},
+    }
+
+
+def store_when_done(response, content, key):
+    """Отдаёт куски потокового ответа и кладёт его в кэш целиком."""
+    started = time.time()
+    chunks = []
+    for chunk in content:
+        chunks.append(chunk)
+        yield chunk
+    entry = make_entry(response, b''.join(chunks))
+    store(key, entry, settings.PAGE_CACHE_TIMEOUT, time.time() - started)
+
+
+def render_entry(view, request, args, kwargs, key):
+    response = view(request, *args, **kwargs)
+    if response.status_code != 200 or not hasattr(response, 'page_posts'):
+        raise Uncached(response)
+    if response.streaming:
+        # Потоковый ответ запоминается, когда допишется;
+        # ETag у него не будет, он появится у следующих
+        response.streaming_content = store_when_done(
+            response, response.streaming_content, key)
+        raise Uncached(with_cache_headers(response))
+    return make_entry(response, response.content)
+
+
+def with_cache_headers(response):
+    patch_cache_control(response, public=True, max_age=0,
+                        must_revalidate=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def anonymous_page_cache(scope_for):
+    """
+    Кэширует ответ view для анонимных GET-запросов.
+    scope_for(request, *args, **kwargs) возвращает область страницы;
+    view отмечает показанные посты через tag_posts.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            scope = scope_for(request, *args, **kwargs)
+            key = page_key(scope, scope_generation(scope), request)
+            try:
+                entry = get_or_compute(
+                    key,
+                    lambda: render_entry(view, request, args, kwargs, key),
+                    settings.PAGE_CACHE_TIMEOUT, fresh=is_fresh)
+            except Uncached as uncached:
+                return uncached.response
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type'])
+            response['ETag'] = entry['etag']
+            response['Last-Modified'] = http_date(entry['last_modified'])
+            with_cache_headers(response)
+            return get_conditional_response(
+                request, etag=entry['etag'],
+                last_modified=entry['last_modified'], response=response)
+        return wrapper
+    return decorator
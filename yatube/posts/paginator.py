@@ -0,0 +1,133 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class CursorPaginator(Paginator):
+    """
+    Paginator, который кроме обычных страниц (?page=N, COUNT + OFFSET)
+    умеет отдавать страницы по непрозрачному курсору: выборка идёт
+    по индексу (date_field, id) без COUNT и без сдвига через OFFSET.
+
+    Страница по курсору — обычный Page с атрибутами cursor,
+    next_cursor и previous_cursor. Общее число объектов в этом режиме
+    неизвестно, поэтому count — только та часть ленты, которую видно
+    из текущего окна (до текущей страницы и одна запись после неё).
+    """
+    OLDER = 'n'
+    NEWER = 'p'
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 **kwargs):
+        self.date_field = date_field
+        ordering = ('-' + date_field, '-pk')
+        if hasattr(object_list, 'order_by'):
+            object_list = object_list.order_by(*ordering)
+        super().__init__(object_list, per_page, **kwargs)
+
+    def get_cursor_page(self, cursor):
+        """
+        Возвращает страницу для курсора из запроса.
+        Пустой или испорченный курсор означает первую страницу.
+        """
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            return self._cursor_page(None, self.OLDER, None, 1)
+        direction, position, number = decoded
+        return self._cursor_page(cursor, direction, position, number)
+
+    def _cursor_page(self, cursor, direction, position, number):
+        rows = list(self.fetch(position, direction, self.per_page + 1))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == self.NEWER:
+            if not has_more:
+                # Дошли до самых свежих записей: отдаём первую страницу
+                return self._cursor_page(None, self.OLDER, None, 1)
+            rows.reverse()
+            has_newer, has_older = True, True
+        else:
+            has_newer, has_older = position is not None, has_more
+        number = max(number, 2) if has_newer else 1
+        # Вместо COUNT(*) — оценка по окну, её хватает методам Page
+        self.count = self.per_page * (number - 1) + len(rows) + has_older
+        page = self._get_page(rows, number, self)
+        page.cursor_mode = True
+        page.cursor = cursor
+        page.next_cursor = page.previous_cursor = None
+        if has_older and rows:
+            page.next_cursor = self.encode_cursor(
+                self.OLDER, rows[-1], number + 1)
+        if has_newer and rows:
+            page.previous_cursor = self.encode_cursor(
+                self.NEWER, rows[0], number - 1)
+        return page
+
+    def fetch(self, position, direction, limit):
+        """
+        Выбирает limit объектов старше (OLDER) или новее (NEWER)
+        позиции (date, pk). Новые записи выбираются по возрастанию.
+        """
+        return keyset_slice(self.object_list, position, direction, limit,
+                            date_field=self.date_field)
+
+    def key(self, obj):
+        return getattr(obj, self.date_field), obj.pk
+
+    def encode_cursor(self, direction, obj, number):
+        date, pk = self.key(obj)
+        raw = json.dumps([direction, date.isoformat(), pk, number])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, date, pk, number = json.loads(
+                base64.urlsafe_b64decode(padded.encode()).decode())
+            date = parse_datetime(date)
+            pk, number = int(pk), int(number)
+        except (TypeError, ValueError):
+            return None
+        if date is None or direction not in (self.OLDER, self.NEWER):
+            return None
+        return direction, (date, pk), max(number, 1)
+
+
+def keyset_slice(queryset, position, direction, limit,
+                 date_field='pub_date', id_field='pk'):
+    """
+    Срез queryset по ключу (date_field, id_field) от позиции position.
+    Записи новее позиции (NEWER) отдаются в порядке возрастания.
+    """
+    descending = ('-' + date_field, '-' + id_field)
+    if position is None:
+        return queryset.order_by(*descending)[:limit]
+    date, pk = position
+    if direction == CursorPaginator.NEWER:
+        return queryset.filter(
+            Q(**{date_field + '__gt': date})
+            | Q(**{date_field: date, id_field + '__gt': pk})
+        ).order_by(date_field, id_field)[:limit]
+    return queryset.filter(
+        Q(**{date_field + '__lt': date})
+        | Q(**{date_field: date, id_field + '__lt': pk})
+    ).order_by(*descending)[:limit]
+
+
+def paginate(request, object_list, per_page=None,
+             paginator_class=CursorPaginator, **kwargs):
+    """
+    Страница ленты для запроса: по курсору (?cursor=...) или,
+    для совместимости со старыми ссылками, по номеру (?page=N).
+    """
+    paginator = paginator_class(
+        object_list, per_page or settings.POSTS_PER_PAGE, **kwargs)
+    if 'page' in request.GET and 'cursor' not in request.GET:
+        return paginator.get_page(request.GET.get('page'))
+    return paginator.get_cursor_page(request.GET.get('cursor'))
@@ -0,0 +1,250 @@
+"""
+Полнотекстовый поиск по постам (SQLite FTS5).
+
+Виртуальная таблица posts_search хранит по строке на пост
+(rowid = id поста): текст поста, тексты его комментариев одной
+колонкой и название группы. Строки обновляются сигналами в той же
+транзакции, что и сами записи, поэтому поиск не отстаёт от базы.
+Результаты ранжируются по bm25: совпадение в тексте поста весит
+больше, чем в названии группы, а то — больше, чем в комментариях.
+
+В индекс пишется не сам текст, а его термы (analyze): слова
+в нижнем регистре, «ё» как «е», русские слова — основами
+(posts.stemmer), слова латиницей — переведёнными в кириллицу
+(pytils), если это русское слово в транслите. Запрос разбирается
+так же, поэтому «пост» находит «постами», а «postami» — «постами».
+Термы считаются один раз при записи, а не при каждом поиске.
+
+На других СУБД (без FTS5) поиск откатывается к icontains по тексту.
+Пересобрать индекс целиком: manage.py rebuild_search. Пересборка
+записывает в posts_search_state версию анализатора (ANALYZER_VERSION);
+пока она не совпадает с текущей — после миграций базы с постами или
+после правки analyze, — поиск тоже идёт через icontains, а не отдаёт
+пустой или устаревший индекс.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from pytils.translit import detranslify
+
+from .models import Post
+from .stemmer import stem
+
+TABLE = 'posts_search'
+STATE_TABLE = 'posts_search_state'
+# Поднимается при каждой правке analyze: старый индекс тогда
+# не используется, пока его не пересоберёт rebuild_search
+ANALYZER_VERSION = 1
+# Веса колонок text, comments, group_title для bm25
+WEIGHTS = (10.0, 2.0, 5.0)
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile('[а-я]')
+CYRILLIC_WORD = re.compile('[а-я]+')
+LATIN_WORD = re.compile('[a-z]+')
+# Сколько постов индексируется за раз при пересборке
+BATCH_SIZE = 500
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "text, comments, group_title, "
+    "tokenize = 'unicode61 remove_diacritics 2')")
+DROP_SQL = f'DROP TABLE IF EXISTS {TABLE}'
+CREATE_STATE_SQL = (
+    f'CREATE TABLE IF NOT EXISTS {STATE_TABLE} (analyzer integer NOT NULL)')
+
+
+def term(word):
+    """Слово в нижнем регистре -> терм индекса."""
+    if CYRILLIC.search(word):
+        return stem(word)
+    if LATIN_WORD.fullmatch(word):
+        try:
+            russian = detranslify(word).lower().replace('ё', 'е')
+        except ValueError:
+            return word
+        # Транслит, который не переводится целиком, — не русское слово
+        if CYRILLIC_WORD.fullmatch(russian):
+            return stem(russian)
+    return word
+
+
+def analyze(text):
+    """Текст -> строка термов для индекса или запроса."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return ' '.join(term(word) for word in words)
+
+
+def available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def built(using=connection):
+    """Индекс собран текущим анализатором."""
+    with using.cursor() as cursor:
+        cursor.execute(f'SELECT analyzer FROM {STATE_TABLE}')
+        row = cursor.fetchone()
+    return row is not None and row[0] == ANALYZER_VERSION
+
+
+def usable(using=connection):
+    """По индексу можно искать: он есть и собран целиком."""
+    return available(using) and built(using)
+
+
+def create(using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(CREATE_STATE_SQL)
+
+
+def drop(using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(DROP_SQL)
+
+
+def rebuild(using=connection):
+    """Пересобирает индекс по всем постам, пачками по BATCH_SIZE."""
+    with using.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        last = 0
+        while True:
+            cursor.execute(
+                'SELECT id FROM posts_post WHERE id > %s ORDER BY id '
+                'LIMIT %s', [last, BATCH_SIZE])
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            write_rows(cursor, ids)
+            last = ids[-1]
+        cursor.execute(f'DELETE FROM {STATE_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {STATE_TABLE} (analyzer) VALUES (%s)',
+            [ANALYZER_VERSION])
+
+
+def write_rows(cursor, post_ids):
+    """Считает строки индекса для постов и записывает их заново."""
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    cursor.execute(
+        'SELECT p.id, p.text, g.title FROM posts_post p '
+        'LEFT JOIN posts_group g ON g.id = p.group_id '
+        f'WHERE p.id IN ({placeholders})', post_ids)
+    posts = cursor.fetchall()
+    cursor.execute(
+        'SELECT post_id, text FROM posts_comment '
+        f'WHERE post_id IN ({placeholders}) ORDER BY id', post_ids)
+    comments = {}
+    for post_id, text in cursor.fetchall():
+        comments.setdefault(post_id, []).append(analyze(text))
+    cursor.execute(
+        f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', post_ids)
+    cursor.executemany(
+        f'INSERT INTO {TABLE} (rowid, text, comments, group_title) '
+        'VALUES (%s, %s, %s, %s)',
+        [(pk, analyze(text), ' '.join(comments.get(pk, ())),
+          analyze(title or '')) for pk, text, title in posts])
+
+
+def index_posts(*post_ids):
+    """Заново индексирует посты: после правки поста или комментария."""
+    if not available() or not post_ids:
+        return
+    with connection.cursor() as cursor:
+        write_rows(cursor, post_ids)
+
+
+def index_comment(post_id, text):
+    """Дописывает термы нового комментария в строку поста."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {TABLE} SET comments = comments || ' ' || %s "
+            'WHERE rowid = %s', [analyze(text), post_id])
+
+
+def unindex_posts(*post_ids):
+    if not available() or not post_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', post_ids)
+
+
+def index_group(group_id, title):
+    """Переписывает название группы у всех её постов."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {TABLE} SET group_title = %s WHERE rowid IN '
+            '(SELECT id FROM posts_post WHERE group_id = %s)',
+            [analyze(title), group_id])
+
+
+def match_expression(query):
+    """
+    Запрос пользователя -> выражение MATCH: каждый терм в кавычках
+    и с поиском по префиксу, термы объединяются через И. Синтаксис
+    FTS5 из запроса не пропускается, так что ошибкой он не обернётся.
+    None — искать нечего.
+    """
+    terms = analyze(query).split()
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching(query):
+    """Подзапрос id подходящих постов, для фильтра pk__in."""
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+                  [match_expression(query)])
+
+
+class SearchResults:
+    """
+    Ранжированные результаты поиска в виде, который понимает
+    Paginator: count() — один COUNT по индексу, срез — id нужной
+    страницы по рангу и посты этой страницы одним запросом.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+        self.query = query
+        self.indexed = self.expression is not None and usable()
+
+    def count(self):
+        if self.expression is None:
+            return 0
+        if not self.indexed:
+            return self.fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                [self.expression])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if self.expression is None:
+            return []
+        if not self.indexed:
+            return list(self.fallback()[item])
+        start = item.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY bm25({TABLE}, %s, %s, %s) LIMIT %s OFFSET %s',
+                [self.expression, *WEIGHTS, item.stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def fallback(self):
+        return Post.objects.feed().filter(text__icontains=self.query)
@@ -0,0 +1,106 @@
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import images, pagecache, search, storage, timeline
+from .models import Comment, Follow, Group, Post, UserCounter
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    old = instance.pk and Post.objects.filter(pk=instance.pk).values_list(
+        'image', 'group__slug').first()
+    instance.old_image, instance.old_group_slug = old or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if instance.image.name != instance.old_image:
+        # Картинку заменили: старый файл может остаться без ссылок
+        storage.retain(instance.image.name)
+        storage.release(instance.old_image)
+    if created:
+        UserCounter.objects.bump(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+        pagecache.purge_scopes(*pagecache.post_scopes(instance))
+    else:
+        # Страницы с постом сбросит его новая версия. Пост могли
+        # перенести в другую группу: в её ленте он новый
+        scopes = pagecache.post_scopes(instance)[1:]
+        if instance.old_group_slug:
+            # Из старой группы пост ушёл: её лента и шапка сдвинулись
+            scopes += (pagecache.group_scope(instance.old_group_slug),)
+        pagecache.purge_scopes(*scopes)
+    search.index_posts(instance.pk)
+    images.enqueue(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    UserCounter.objects.bump(instance.author_id, 'posts_count', -1)
+    storage.release(instance.image.name)
+    search.unindex_posts(instance.pk)
+    pagecache.purge_scopes(*pagecache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1,
+            version=F('version') + 1)
+        search.index_comment(instance.post_id, instance.text)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') - 1,
+            version=F('version') + 1)
+        search.index_posts(instance.post_id)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, **kwargs):
+    instance.old_slug = instance.pk and Group.objects.filter(
+        pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    if not created:
+        search.index_group(instance.pk, instance.title)
+        # Название группы есть в карточках её постов во всех лентах
+        pagecache.purge_scopes(
+            pagecache.INDEX, pagecache.group_scope(instance.slug),
+            pagecache.group_scope(instance.old_slug))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления group_id постов уже обнулён, и их не найти
+    search.index_group(instance.pk, '')
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    pagecache.purge_scopes(
+        pagecache.INDEX, pagecache.group_scope(instance.slug))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        UserCounter.objects.bump(instance.author_id, 'followers_count', 1)
+        UserCounter.objects.bump(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    UserCounter.objects.bump(instance.author_id, 'followers_count', -1)
+    UserCounter.objects.bump(instance.user_id, 'following_count', -1)
+    timeline.forget(instance.user_id, instance.author_id)
+    timeline.unpull(instance.author_id)
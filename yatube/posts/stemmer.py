@@ -0,0 +1,123 @@
+"""
+Стеммер для русского языка: алгоритм Snowball (Портера).
+
+Отрезает от слова окончания и суффиксы словоизменения, чтобы
+«постами», «посты» и «поста» свелись к одной основе «пост».
+Ожидает слово в нижнем регистре с «ё», уже заменённой на «е».
+"""
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+     'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+     'ья', 'я'),
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def regions(word):
+    """Начала областей RV и R2 (индексы в слове)."""
+    def after_vowel_pair(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    rv = next((i + 1 for i, letter in enumerate(word) if letter in VOWELS),
+              len(word))
+    r1 = after_vowel_pair(0)
+    return rv, after_vowel_pair(r1)
+
+
+def strip(rv, groups):
+    """
+    Отрезает самое длинное окончание из groups; окончания первой
+    группы допустимы только после «а» или «я». None — ничего не нашлось.
+    """
+    after_a, plain = groups
+    candidates = sorted(
+        [(ending, True) for ending in after_a]
+        + [(ending, False) for ending in plain],
+        key=lambda candidate: -len(candidate[0]))
+    for ending, needs_a in candidates:
+        if not rv.endswith(ending):
+            continue
+        if needs_a and (len(rv) == len(ending)
+                        or rv[-len(ending) - 1] not in 'ая'):
+            continue
+        return rv[:-len(ending)]
+    return None
+
+
+def stem(word):
+    rv_start, r2_start = regions(word)
+    head, rv = word[:rv_start], word[rv_start:]
+    rv = strip_inflection(rv)
+    # Шаг 2: «и» на конце
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    # Шаг 3: словообразовательный суффикс в R2
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and (
+                rv_start + len(rv) - len(ending) >= r2_start):
+            rv = rv[:-len(ending)]
+            break
+    return head + tidy(rv)
+
+
+def strip_inflection(rv):
+    """
+    Шаг 1: деепричастия, иначе возвратность и окончания
+    прилагательных/причастий, глаголов или существительных.
+    """
+    stripped = strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    reflexive = strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    adjective = strip(rv, ADJECTIVE)
+    if adjective is not None:
+        participle = strip(adjective, PARTICIPLE)
+        return adjective if participle is None else participle
+    for groups in (VERB, NOUN):
+        stripped = strip(rv, groups)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+def tidy(rv):
+    """Шаг 4: «нн», превосходная степень, мягкий знак."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            return rv[:-1] if rv.endswith('нн') else rv
+    return rv[:-1] if rv.endswith('ь') else rv
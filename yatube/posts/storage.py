@@ -0,0 +1,56 @@
+"""
+Хранилище картинок постов без дублей.
+
+Каждый загруженный файл хешируется (sha256). Если такое содержимое
+уже лежит в хранилище, новый файл не пишется: пост получает имя
+существующего. Учёт ведётся в StoredFile: хеш, имя и число постов,
+которые на файл ссылаются (refcount). Счётчик двигают сигналы
+сохранения и удаления поста; файлы, на которые больше никто
+не ссылается, удаляет команда gc_media.
+
+Первая копия сохраняет исходное имя (posts/cat.jpg), поэтому адреса
+картинок остаются читаемыми.
+"""
+import hashlib
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class DeduplicatingStorage(FileSystemStorage):
+    """FileSystemStorage, который не пишет одно содержимое дважды."""
+
+    def _save(self, name, content):
+        stored_files = apps.get_model('posts', 'StoredFile').objects
+        digest = file_digest(content)
+        stored = stored_files.filter(digest=digest).first()
+        if stored is not None and self.exists(stored.name):
+            return stored.name
+        name = super()._save(name, content)
+        stored_files.update_or_create(
+            digest=digest, defaults={'name': name, 'size': content.size})
+        return name
+
+
+def retain(name):
+    """Ещё один пост ссылается на файл name."""
+    if name:
+        apps.get_model('posts', 'StoredFile').objects.filter(
+            name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name):
+    """Пост больше не ссылается на файл name."""
+    if name:
+        apps.get_model('posts', 'StoredFile').objects.filter(
+            name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
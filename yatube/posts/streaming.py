@@ -0,0 +1,66 @@
+"""
+Потоковая отрисовка лент (STREAM_FEEDS).
+
+Страница рендерится без карточек постов: {% post_cards %} оставляет
+на их месте метку. Ответ сразу отдаёт всё до метки — шапку base.html,
+nav.html, меню, — затем карточки по одной, по мере отрисовки,
+и в конце остаток страницы (пагинатор, подвал). Время до первого
+байта перестаёт зависеть от числа постов и от того, сколько
+рисуются их карточки.
+
+Страницу ленты view передаёт ленивой (LazyPage): её запрос
+выполняется, только когда шапка уже ушла. Для этого шапка рендерится
+отдельно, без ленивых значений контекста, а страница целиком — после
+неё, с уже выбранной лентой. Шаблон до {% post_cards %} не должен
+обращаться к ленте.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject, empty
+
+from .templatetags.post_cards import CARDS_MARKER, iter_cards
+
+
+class LazyPage(SimpleLazyObject):
+    """Страница ленты, которая выбирается при первом обращении."""
+
+    def __init__(self, paginate, *args, **kwargs):
+        super().__init__(lambda: paginate(*args, **kwargs))
+
+    def resolve(self):
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
+
+
+def resolved(context):
+    """Контекст, где ленивые страницы заменены выбранными."""
+    return {name: value.resolve() if isinstance(value, LazyPage) else value
+            for name, value in context.items()}
+
+
+def render_feed(request, template_name, context):
+    """Как render, но при STREAM_FEEDS отдаёт ленту потоком."""
+    if not settings.STREAM_FEEDS:
+        return render(request, template_name, resolved(context))
+    return StreamingHttpResponse(
+        chunks(request, template_name, context),
+        content_type='text/html; charset=utf-8')
+
+
+def chunks(request, template_name, context):
+    head_context = {
+        name: None if isinstance(value, LazyPage) else value
+        for name, value in context.items()}
+    head = render_to_string(
+        template_name, dict(head_context, card_stream=[]), request)
+    yield head.split(CARDS_MARKER)[0]
+    stream = []
+    page = render_to_string(
+        template_name, dict(resolved(context), card_stream=stream), request)
+    parts = page.split(CARDS_MARKER)
+    for (card_context, posts, engine), tail in zip(stream, parts[1:]):
+        yield from iter_cards(card_context, posts, engine)
+        yield tail
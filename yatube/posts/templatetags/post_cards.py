@@ -0,0 +1,63 @@
+from django import template
+from django.template import Context
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from posts.caching import get_cache, iter_or_compute
+from posts.images import attach_renditions
+
+register = template.Library()
+
+CARDS_MARKER = '<!-- post-cards -->'
+
+
+def card_key(post, user):
+    """
+    Ключ карточки: id и версия поста. Автор видит в карточке кнопку
+    редактирования, поэтому его вариант хранится отдельно.
+    """
+    is_author = bool(user and user.is_authenticated
+                     and user.pk == post.author_id)
+    return f'post_card:{post.pk}:{post.version}:{int(is_author)}'
+
+
+def iter_cards(context, posts, engine):
+    """
+    Карточки страницы по одной: готовые — из кэша, остальные
+    отрисовываются по мере того, как до них доходит очередь.
+    Одну карточку рисует один процесс (posts.caching.iter_or_compute).
+    """
+    cache = get_cache()
+    posts = {card_key(post, context.get('user')): post for post in posts}
+    keys = list(posts)
+    card_template = engine.get_template('post_item.html')
+
+    def prepare(missing):
+        # Превью карточек, которых нет в кэше, — одним запросом
+        attach_renditions(posts[key] for key in missing)
+
+    def render(key):
+        with context.push(post=posts[key]):
+            return card_template.render(context)
+
+    yield from iter_or_compute(keys, render, settings.POST_CARD_TIMEOUT,
+                               cache=cache, prepare=prepare)
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """
+    Собирает страницу ленты из закэшированных карточек post_item.html.
+    Все карточки страницы читаются из кэша одним запросом,
+    заново отрисовываются только изменившиеся.
+
+    При потоковой отрисовке (posts.streaming) вместо карточек
+    выводится метка: сами карточки ответ отдаст после шапки страницы.
+    """
+    stream = context.get('card_stream')
+    if stream is not None:
+        stream.append((Context(context.flatten()), posts,
+                       context.template.engine))
+        return mark_safe(CARDS_MARKER)
+    return mark_safe(''.join(
+        iter_cards(context, posts, context.template.engine)))
@@ -0,0 +1,45 @@
+from django import template
+
+from posts.images import RENDITIONS
+from posts.models import Rendition
+
+register = template.Library()
+
+# Карточка занимает всю ширину колонки, но не больше своей ширины
+SIZES = '(max-width: {width}px) 100vw, {width}px'
+
+
+def srcset(renditions):
+    return ', '.join(f'{r.file.url} {r.width}w' for r in renditions)
+
+
+@register.inclusion_tag('posts/post_image.html')
+def post_image(post, name='card'):
+    """
+    Превью картинки поста в разметке <picture>: WebP для браузеров,
+    которые его понимают, JPEG для остальных, в каждом — srcset
+    из нескольких ширин. Превью режутся в фоне (posts.images),
+    и пока готовых нет, вместо них выводится заглушка того же размера.
+    Ленты подтягивают превью страницы заранее (attach_renditions).
+    """
+    width, height = RENDITIONS[name]
+    context = {'post': post, 'width': width, 'height': height,
+               'sizes': SIZES.format(width=width), 'sources': []}
+    if not post.image:
+        return context
+    renditions = getattr(post, 'page_renditions', None)
+    if renditions is None:
+        renditions = Rendition.objects.filter(post=post,
+                                              image=post.image.name)
+    by_format = {}
+    for rendition in renditions:
+        if rendition.name == name:
+            by_format.setdefault(rendition.format, []).append(rendition)
+    fallback = by_format.pop(Rendition.JPEG, None)
+    if fallback:
+        context['img'] = fallback[-1]
+        context['srcset'] = srcset(fallback)
+        context['sources'] = [
+            {'type': renditions[0].mime_type, 'srcset': srcset(renditions)}
+            for renditions in by_format.values()]
+    return context
@@ -0,0 +1,83 @@
+import gzip
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class JsonApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_api')
+        cls.group = Group.objects.create(title='Апи', slug='api-group')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(3)]
+        Comment.objects.create(text='Комментарий', author=cls.author,
+                               post=cls.posts[0])
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.status_code, json.loads(response.content)
+
+    def test_feed_pages_by_cursor(self):
+        """Лента листается по курсору, свежие посты первыми."""
+        url = reverse('posts:api_feed')
+        status, first = self.get(url)
+        self.assertEqual(status, 200)
+        self.assertEqual([post['text'] for post in first['results']],
+                         ['Пост 2', 'Пост 1'])
+        self.assertIsNone(first['previous'])
+        _, second = self.get(url, cursor=first['next'])
+        self.assertEqual([post['text'] for post in second['results']],
+                         ['Пост 0'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(second['results'][0]['author'], 'Konst_api')
+        self.assertEqual(second['results'][0]['group'], 'api-group')
+
+    def test_sparse_fields(self):
+        """?fields= ограничивает и SELECT, и ответ."""
+        with self.assertNumQueries(1):
+            _, data = self.get(reverse('posts:api_feed'), fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        status, data = self.get(reverse('posts:api_feed'),
+                                fields='id,password')
+        self.assertEqual(status, 400)
+        self.assertIn('password', data['error'])
+
+    def test_group_profile_and_detail(self):
+        post = self.posts[0]
+        _, data = self.get(reverse('posts:api_group_feed',
+                                   args=['api-group']))
+        self.assertEqual(len(data['results']), 2)
+        _, data = self.get(reverse('posts:api_profile_feed',
+                                   args=['Konst_api']))
+        self.assertEqual(len(data['results']), 2)
+        _, data = self.get(reverse('posts:api_post', args=[post.pk]))
+        self.assertEqual(data['comments_count'], 1)
+        self.assertIsNone(data['image'])
+        _, data = self.get(reverse('posts:api_comments', args=[post.pk]),
+                           fields='text,author')
+        self.assertEqual(data['results'],
+                         [{'text': 'Комментарий', 'author': 'Konst_api'}])
+        for url in (reverse('posts:api_group_feed', args=['missing']),
+                    reverse('posts:api_profile_feed', args=['missing']),
+                    reverse('posts:api_post', args=[0]),
+                    reverse('posts:api_comments', args=[0])):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url)[0], 404)
+
+    def test_gzip_and_read_only(self):
+        response = self.client.get(reverse('posts:api_feed'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('results', json.loads(gzip.decompress(
+            response.content)))
+        response = self.client.post(reverse('posts:api_feed'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+from posts import benchmark
+from posts.caching import get_cache
+from posts.models import Comment, Follow, Post, UserCounter
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_seed_and_run(self):
+        """Засев и замер на маленькой базе."""
+        benchmark.seed(users=30, posts=200, comments=50, groups=3,
+                       follows=5, log=lambda line: None, seed=1)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(Follow.objects.exists())
+        # Даты засеянных постов — из прошлого, а не момент вставки
+        self.assertGreater(
+            Post.objects.dates('pub_date', 'day').count(), 1)
+        top = UserCounter.objects.order_by('-posts_count').first()
+        self.assertEqual(top.posts_count,
+                         Post.objects.filter(author=top.user).count())
+        # Авторы — по степенному закону: у самого популярного заметная
+        # доля постов, а не около 1/30, как при равномерном выборе
+        self.assertGreater(top.posts_count, 200 * 0.15)
+
+        report = benchmark.run(transports=('client',), repeat=3, warmup=0,
+                               log=lambda line: None)
+        scenarios = [row['scenario'] for row in report['results']]
+        self.assertEqual(scenarios, [
+            'index', 'group_posts', 'profile', 'post_view', 'follow_index',
+            'new_post', 'add_comment'])
+        for row in report['results']:
+            with self.subTest(scenario=row['scenario']):
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+                self.assertGreater(row['queries_per_request'], 0)
+                self.assertTrue(set(row['statuses']) <= {200, 302})
+        # new_post добавил по посту на каждый запрос
+        self.assertEqual(report['meta']['rows']['posts'], 203)
+        self.assertEqual(len(list(benchmark.compare(report, report))), 7)
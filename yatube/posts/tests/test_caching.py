@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from posts import caching
+from posts.caching import SharedFileCache, get_or_compute, iter_or_compute
+
+
+class SharedFileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.cache = SharedFileCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def run_threads(self, target, count=8):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_add_is_atomic(self):
+        """Из нескольких одновременных add ключ получает только один."""
+        results = []
+        self.run_threads(lambda: results.append(self.cache.add('lock', 1)))
+        self.assertEqual(results.count(True), 1)
+
+    def test_incr_is_atomic(self):
+        """Одновременные incr не теряют приращений."""
+        self.cache.set('counter', 0)
+
+        def incr():
+            for _ in range(10):
+                self.cache.incr('counter')
+
+        self.run_threads(incr)
+        self.assertEqual(self.cache.get('counter'), 80)
+
+    def test_lock_files_do_not_grow_with_keys(self):
+        """Файлов блокировок не больше lock_stripes, сколько ни ключей."""
+        for i in range(200):
+            self.cache.add(f'lock:{i}', 1)
+            self.cache.delete(f'lock:{i}')
+        locks = [name for name in os.listdir(self.location)
+                 if name.endswith(SharedFileCache.lock_suffix)]
+        self.assertLessEqual(len(locks), SharedFileCache.lock_stripes)
+
+    def test_cull_lists_files_once_per_interval(self):
+        """Файлы кэша перечисляются не перед каждой записью."""
+        with mock.patch.object(
+                self.cache, '_list_cache_files',
+                wraps=self.cache._list_cache_files) as listed:
+            for i in range(5):
+                self.cache.set(f'key:{i}', i)
+        self.assertEqual(listed.call_count, 1)
+
+    def test_cache_is_shared_between_instances(self):
+        """Значение видно из другого экземпляра, как из другого воркера."""
+        self.cache.set('key', 'value')
+        other = SharedFileCache(self.location, {})
+        self.assertEqual(other.get('key'), 'value')
+
+
+class GetOrComputeTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.cache = SharedFileCache(self.location, {})
+        self.calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def get(self, **kwargs):
+        return get_or_compute('key', self.compute, 60, cache=self.cache,
+                              **kwargs)
+
+    def test_value_is_computed_once(self):
+        """Свежее значение берётся из кэша."""
+        self.assertEqual(self.get(), 'value 1')
+        self.assertEqual(self.get(), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_value_is_recomputed_early(self):
+        """Перед истечением срока значение пересчитывается заранее."""
+        self.get()
+        # Бесконечный «запас»: срок наступил для этого читателя
+        with mock.patch.object(caching.math, 'log',
+                               return_value=float('-inf')):
+            self.assertEqual(self.get(), 'value 2')
+
+    def test_stale_value_is_served_while_locked(self):
+        """Пока пересчитывает другой процесс, отдаётся старое значение."""
+        self.get()
+        self.cache.add('key:lock', 1)
+        with mock.patch.object(caching.math, 'log',
+                               return_value=float('-inf')):
+            self.assertEqual(self.get(), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_miss_waits_for_lock_owner(self):
+        """При промахе без блокировки ждём значение от её владельца."""
+        self.cache.add('key:lock', 1)
+
+        def owner():
+            time.sleep(0.2)
+            self.cache.set('key', ('from owner', 0.1, time.time() + 60))
+
+        thread = threading.Thread(target=owner)
+        thread.start()
+        self.assertEqual(self.get(), 'from owner')
+        thread.join()
+        self.assertEqual(self.calls, 0)
+
+    def test_stale_value_is_a_miss(self):
+        """Значение, которое fresh отверг, считается заново."""
+        self.get()
+        self.assertEqual(self.get(fresh=lambda value: False), 'value 2')
+        self.assertEqual(self.get(fresh=lambda value: True), 'value 2')
+
+    def test_many_keys_compute_only_missing(self):
+        """iter_or_compute считает только то, чего нет в кэше."""
+        self.get()
+        missing = []
+        values = iter_or_compute(
+            ['key', 'other'], lambda key: f'{key} computed', 60,
+            cache=self.cache, prepare=missing.extend)
+        self.assertEqual(list(values), ['value 1', 'other computed'])
+        self.assertEqual(missing, ['other'])
+        self.assertEqual(self.cache.get('other')[0], 'other computed')
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_card')
+        cls.reader = User.objects.create_user(username='Konst_card_reader')
+        cls.group = Group.objects.create(title='Карточки', slug='cards')
+        cls.post = Post.objects.create(
+            text='Текст карточки', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('posts:groups', args=[self.group.slug])
+
+    def rendered_cards(self, response):
+        return [template.name for template in response.templates
+                if template.name == 'post_item.html']
+
+    def test_cards_are_rendered_once(self):
+        """Неизменившаяся карточка берётся из кэша, а не отрисовывается."""
+        first = self.reader_client.get(self.url)
+        second = self.reader_client.get(self.url)
+        self.assertEqual(len(self.rendered_cards(first)), 1)
+        self.assertEqual(self.rendered_cards(second), [])
+        self.assertContains(second, 'Текст карточки')
+
+    def test_author_card_is_cached_separately(self):
+        """Кнопка редактирования не попадает в карточку для читателя."""
+        edit_url = reverse('posts:post_edit',
+                           args=[self.author.username, self.post.id])
+        self.assertContains(self.author_client.get(self.url), edit_url)
+        self.assertNotContains(self.reader_client.get(self.url), edit_url)
+
+    def test_post_edit_invalidates_card(self):
+        """post_edit сбрасывает карточку поста."""
+        self.reader_client.get(self.url)
+        self.author_client.post(
+            reverse('posts:post_edit',
+                    args=[self.author.username, self.post.id]),
+            {'text': 'Новый текст карточки', 'group': self.group.id})
+        self.assertContains(
+            self.reader_client.get(self.url), 'Новый текст карточки')
+
+    def test_add_comment_invalidates_card(self):
+        """add_comment обновляет число комментариев в карточке."""
+        self.reader_client.get(self.url)
+        self.reader_client.post(
+            reverse('posts:add_comment',
+                    args=[self.author.username, self.post.id]),
+            {'text': 'Комментарий'})
+        self.assertContains(
+            self.reader_client.get(self.url), 'Комментариев: 1')
+
+    def test_group_rename_invalidates_card(self):
+        """Переименование группы сбрасывает карточки её постов."""
+        self.reader_client.get(self.url)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(
+            self.reader_client.get(self.url), '#Новое название')
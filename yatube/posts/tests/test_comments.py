@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_comments')
+        cls.post = Post.objects.create(text='Вирусный пост',
+                                       author=cls.author)
+        for number in range(12):
+            commenter = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(text=f'Комментарий {number}',
+                                   author=commenter, post=cls.post)
+        cls.post_url = reverse('posts:post',
+                               args=[cls.author.username, cls.post.pk])
+        cls.more_url = reverse('posts:post_comments',
+                               args=[cls.author.username, cls.post.pk])
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_post_page_shows_first_page_only(self):
+        """Страница поста показывает только свежие комментарии."""
+        response = self.client.get(self.post_url)
+        comments = response.context['comments']
+        self.assertEqual(self.texts(comments),
+                         [f'Комментарий {n}' for n in (11, 10, 9, 8, 7)])
+        self.assertContains(response, 'data-fragment')
+        self.assertNotContains(response, 'Комментарий 6<')
+
+    def test_fragment_pages_by_cursor_with_authors_joined(self):
+        cursor = self.client.get(self.post_url).context[
+            'comments'].next_cursor
+        with self.assertNumQueries(1):
+            response = self.client.get(self.more_url, {'cursor': cursor})
+        self.assertNotContains(response, '<html')
+        self.assertEqual(self.texts(response.context['comments']),
+                         [f'Комментарий {n}' for n in (6, 5, 4, 3, 2)])
+        self.assertContains(response, 'reader6')
+        last = response.context['comments'].next_cursor
+        response = self.client.get(self.more_url, {'cursor': last})
+        self.assertEqual(self.texts(response.context['comments']),
+                         ['Комментарий 1', 'Комментарий 0'])
+        self.assertNotContains(response, 'data-fragment')
+
+    def test_fragment_of_missing_post(self):
+        response = self.client.get(reverse(
+            'posts:post_comments', args=[self.author.username, 0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_fragment_of_another_author_is_not_found(self):
+        """Комментарии поста не отдаются по адресу чужого автора."""
+        other = User.objects.create_user(username='Not_the_commenter')
+        response = self.client.get(reverse(
+            'posts:post_comments', args=[other.username, self.post.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_view_queries_do_not_grow_with_comments(self):
+        """ETag, пост с автором и группой, страница комментариев."""
+        # Первый запрос заводит строку счётчиков автора
+        self.client.get(self.post_url)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.post_url)
+        self.assertEqual(response.context['author'], self.author)
+        self.assertEqual(response.context['posts_count'], 1)
+
+    def test_post_of_another_author_is_not_found(self):
+        other = User.objects.create_user(username='Not_the_author')
+        response = self.client.get(
+            reverse('posts:post', args=[other.username, self.post.pk]))
+        self.assertEqual(response.status_code, 404)
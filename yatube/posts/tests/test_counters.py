@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Post, UserCounter
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_counter')
+        cls.reader = User.objects.create_user(username='Konst_fan')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def counter(self, user):
+        return UserCounter.objects.for_user(user)
+
+    def test_new_post_and_delete_update_posts_count(self):
+        """new_post увеличивает счётчик записей, удаление уменьшает."""
+        self.counter(self.author)
+        self.author_client.post(reverse('posts:new_post'), {'text': 'Пост'})
+        self.assertEqual(self.counter(self.author).posts_count, 1)
+        Post.objects.get(author=self.author).delete()
+        self.assertEqual(self.counter(self.author).posts_count, 0)
+
+    def test_add_comment_updates_comments_count(self):
+        """add_comment увеличивает comments_count поста."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.author.username,
+                                               post.id]),
+            {'text': 'Комментарий'})
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_and_unfollow_update_counters(self):
+        """Подписка и отписка меняют счётчики обеих сторон."""
+        self.counter(self.author)
+        self.counter(self.reader)
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.counter(self.author).followers_count, 1)
+        self.assertEqual(self.counter(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.counter(self.author).followers_count, 0)
+        self.assertEqual(self.counter(self.reader).following_count, 0)
+
+    def test_missing_counter_is_counted_from_scratch(self):
+        """Счётчики без строки в базе считаются при первом чтении."""
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounter.objects.all().delete()
+        counter = self.counter(self.author)
+        self.assertEqual(counter.posts_count, 1)
+        self.assertEqual(counter.followers_count, 1)
+
+    def test_rebuild_counters_command(self):
+        """rebuild_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(text='Комментарий', author=self.reader,
+                               post=post)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(comments_count=10)
+        UserCounter.objects.update(
+            posts_count=10, followers_count=10, following_count=10)
+        call_command('rebuild_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        author = self.counter(self.author)
+        reader = self.counter(self.reader)
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count), (1, 1, 0))
+        self.assertEqual(
+            (reader.posts_count, reader.followers_count,
+             reader.following_count), (0, 0, 1))
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Post, UserCounter
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_etag')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        UserCounter.objects.rebuild()
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.post_url = reverse('posts:post', args=[self.author.username,
+                                                    self.post.pk])
+        self.profile_url = reverse('posts:profile',
+                                   args=[self.author.username])
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменённые пост и профиль отдаются ответом 304."""
+        for url in (self.post_url, self.profile_url):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_revalidation_does_not_build_context(self):
+        """Проверка поста — один запрос по первичному ключу."""
+        etag = self.client.get(self.post_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.post_url,
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_update_etag(self):
+        """Комментарий, правка и новый пост меняют ETag."""
+        post_etag = self.client.get(self.post_url)['ETag']
+        Comment.objects.create(text='Комментарий', author=self.author,
+                               post=self.post)
+        self.assertNotEqual(
+            self.client.get(self.post_url)['ETag'], post_etag)
+        profile_etag = self.client.get(self.profile_url)['ETag']
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        edited_etag = self.client.get(self.profile_url)['ETag']
+        self.assertNotEqual(edited_etag, profile_etag)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertNotEqual(
+            self.client.get(self.profile_url)['ETag'], edited_etag)
+
+    def test_etag_is_not_valid_under_another_username(self):
+        """ETag поста под чужим именем не даёт 304 вместо 404."""
+        User.objects.create_user(username='Konst_other')
+        etag = self.client.get(self.post_url)['ETag']
+        response = self.client.get(
+            reverse('posts:post', args=['Konst_other', self.post.pk]),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_depends_on_viewer(self):
+        """Автор и аноним получают разные ETag."""
+        self.assertNotEqual(
+            self.client.get(self.profile_url)['ETag'],
+            self.author_client.get(self.profile_url)['ETag'])
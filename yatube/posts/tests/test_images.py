@@ -0,0 +1,141 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from posts import images
+from posts.caching import get_cache
+from posts.models import ImageJob, Post, Rendition
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name='photo.png', size=(400, 300), mode='RGBA'):
+    buffer = BytesIO()
+    Image.new(mode, size, (255, 0, 0, 128)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_WORKERS=0)
+class ImagePipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_images')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        get_cache().clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def new_post(self, image):
+        self.author_client.post(reverse('posts:new_post'),
+                                {'text': 'Пост с картинкой', 'image': image})
+        return Post.objects.get(author=self.author)
+
+    def test_new_post_enqueues_job_and_shows_placeholder(self):
+        """Сохранение картинки ставит задание, а не режет превью."""
+        post = self.new_post(make_image())
+        job = ImageJob.objects.get(post=post)
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertFalse(Rendition.objects.exists())
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Картинка обрабатывается')
+
+    def test_drain_renders_renditions(self):
+        """Обработчик режет превью, и лента показывает его."""
+        post = self.new_post(make_image())
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(images.drain(), 1)
+        rendition = Rendition.objects.get(post=post, name='card',
+                                          format=Rendition.JPEG, width=960)
+        self.assertEqual(rendition.height, 339)
+        self.assertEqual(ImageJob.objects.get(post=post).status,
+                         ImageJob.DONE)
+        # Превью растит версию поста: кэш карточек и страниц сброшен
+        self.assertGreater(Post.objects.get(pk=post.pk).version,
+                           post.version)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, rendition.file.url)
+
+    def test_replaced_image_gets_new_renditions(self):
+        post = self.new_post(make_image())
+        images.drain()
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.author.username,
+                                             post.pk]),
+            {'text': 'Новая картинка', 'image': make_image('other.png')})
+        images.drain()
+        post.refresh_from_db()
+        sources = Rendition.objects.filter(post=post).values_list(
+            'image', flat=True)
+        self.assertEqual(set(sources), {post.image.name})
+
+    def test_broken_image_is_retried_then_failed(self):
+        post = Post.objects.create(text='Пост', author=self.author,
+                                   image='posts/missing.png')
+        for attempt in range(3):
+            images.drain(limit=1)
+        job = ImageJob.objects.get(post=post)
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertTrue(job.error)
+
+    def test_stale_running_job_is_requeued(self):
+        """Задание упавшего обработчика возвращается в очередь."""
+        post = self.new_post(make_image())
+        ImageJob.objects.update(
+            status=ImageJob.RUNNING, attempts=1,
+            started=timezone.now() - timedelta(hours=1))
+        self.assertEqual(images.drain(), 1)
+        self.assertTrue(Rendition.objects.filter(post=post).exists())
+
+    def test_renditions_cover_widths_and_formats(self):
+        """Превью режется в нескольких ширинах, в JPEG и WebP."""
+        post = self.new_post(make_image())
+        images.drain()
+        sizes = set(Rendition.objects.filter(post=post).values_list(
+            'format', 'width', 'height'))
+        self.assertEqual(sizes, {
+            (image_format, width, height)
+            for image_format in (Rendition.JPEG, Rendition.WEBP)
+            for width, height in ((320, 113), (640, 226), (960, 339))})
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, ' 320w, ')
+
+    def test_complete_renditions_are_not_enqueued_again(self):
+        post = self.new_post(make_image())
+        images.drain()
+        post.text = 'Правка без новой картинки'
+        post.save()
+        self.assertEqual(ImageJob.objects.filter(post=post).count(), 1)
+
+    def test_feed_fetches_renditions_in_one_query(self):
+        """Превью всей страницы ленты читаются одним запросом."""
+        for i in range(3):
+            self.author_client.post(reverse('posts:new_post'), {
+                'text': f'Пост {i}', 'image': make_image(f'{i}.png')})
+        images.drain()
+        get_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>', count=3)
+        lookups = [query for query in queries
+                   if 'posts_rendition' in query['sql']]
+        self.assertEqual(len(lookups), 1)
@@ -1,5 +1,11 @@
+import datetime as dt
+import re
+from unittest import skipUnless
+
 from django.test import TestCase
+from django.db import connection
 from posts.models import Post, Group
+from posts.paginator import CursorPaginator
 from django.contrib.auth.models import User
 
 
@@ -84,3 +90,54 @@ class ModelTest(TestCase):
         group = ModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN в SQLite')
+class IndexPlanTest(TestCase):
+    full_scan = re.compile(r'SCAN (TABLE )?posts_(post|comment)\b(?! USING)')
+    sort = 'USE TEMP B-TREE FOR ORDER BY'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='plan')
+        cls.group = Group.objects.create(title='plan', slug='plan')
+        cls.post = Post.objects.create(
+            text='План', author=cls.author, group=cls.group)
+        cls.position = (dt.datetime(2022, 5, 1, tzinfo=dt.timezone.utc), 1)
+
+    def feed_plans(self, queryset):
+        """Планы первой страницы и страниц по курсору в обе стороны."""
+        paginator = CursorPaginator(queryset, 10)
+        return [
+            paginator.fetch(None, paginator.OLDER, 11).explain(),
+            paginator.fetch(self.position, paginator.OLDER, 11).explain(),
+            paginator.fetch(self.position, paginator.NEWER, 11).explain(),
+        ]
+
+    def test_feeds_use_indexes(self):
+        """Ленты читаются по индексу, без полного прохода и сортировки."""
+        feeds = {
+            'index': Post.objects.feed(),
+            'profile': Post.objects.feed().filter(author=self.author),
+            'group': Post.objects.feed().filter(group=self.group),
+        }
+        for name, queryset in feeds.items():
+            for plan in self.feed_plans(queryset):
+                with self.subTest(feed=name, plan=plan):
+                    self.assertNotRegex(plan, self.full_scan)
+                    self.assertNotIn(self.sort, plan)
+
+    def test_follow_feed_does_not_scan_posts(self):
+        """Лента подписок ищет посты по индексу автора."""
+        queryset = Post.objects.feed().filter(
+            author__following__user=self.author)
+        for plan in self.feed_plans(queryset):
+            with self.subTest(plan=plan):
+                self.assertNotRegex(plan, self.full_scan)
+
+    def test_post_comments_use_index(self):
+        """Комментарии поста читаются по индексу в нужном порядке."""
+        plan = self.post.comments.all().explain()
+        self.assertNotRegex(plan, self.full_scan)
+        self.assertNotIn(self.sort, plan)
@@ -0,0 +1,155 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import pagecache
+from posts.caching import get_cache
+from posts.models import Comment, Group, Post
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_pages')
+        cls.group = Group.objects.create(title='Кэш', slug='cached')
+        cls.other = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(text='Пост в группе',
+                                       author=cls.author, group=cls.group)
+        cls.other_post = Post.objects.create(
+            text='Пост в другой группе', author=cls.author, group=cls.other)
+
+    def setUp(self):
+        # Откат базы между тестами не откатывает кэш
+        get_cache().clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.index = reverse('posts:index')
+        self.group_url = reverse('posts:groups', args=['cached'])
+        self.other_url = reverse('posts:groups', args=['other'])
+
+    def assertCached(self, url, **params):
+        self.client.get(url, params)
+        # Единственный запрос сверяет версии постов страницы
+        with self.assertNumQueries(1):
+            return self.client.get(url, params)
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        """Повторный анонимный запрос берётся из кэша."""
+        response = self.assertCached(self.index)
+        self.assertContains(response, 'Пост в группе')
+        self.assertCached(self.index, page=1)
+        self.assertCached(self.group_url)
+
+    def test_authenticated_pages_are_not_cached(self):
+        self.author_client.get(self.index)
+        response = self.author_client.get(self.index)
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
+
+    def test_new_post_purges_its_scopes_only(self):
+        """Новый пост сбрасывает index и свою группу, но не чужую."""
+        self.assertCached(self.index)
+        self.assertCached(self.other_url)
+        self.author_client.post(reverse('posts:new_post'), {
+            'text': 'Свежий пост', 'group': self.group.pk})
+        self.assertContains(self.client.get(self.index), 'Свежий пост')
+        self.assertContains(self.client.get(self.group_url), 'Свежий пост')
+        with self.assertNumQueries(1):
+            self.client.get(self.other_url)
+
+    def test_edit_purges_pages_with_the_post(self):
+        """Правка поста сбрасывает только страницы, где он показан."""
+        self.assertCached(self.index)
+        self.assertCached(self.other_url)
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.author.username,
+                                             self.post.pk]),
+            {'text': 'Исправленный пост', 'group': self.group.pk})
+        self.assertContains(self.client.get(self.index), 'Исправленный')
+        with self.assertNumQueries(1):
+            self.client.get(self.other_url)
+
+    def test_lost_generation_does_not_revive_stale_pages(self):
+        """Пропавшее из кэша поколение не возвращает старые страницы."""
+        for text in ('Первый новый пост', 'Второй новый пост'):
+            self.assertCached(self.index)
+            get_cache().delete(pagecache.scope_key(pagecache.INDEX))
+            Post.objects.create(text=text, author=self.author)
+            self.assertContains(self.client.get(self.index), text)
+
+    def test_comment_purges_pages_with_the_post(self):
+        self.assertCached(self.group_url)
+        Comment.objects.create(text='Комментарий', author=self.author,
+                               post=self.post)
+        response = self.client.get(self.group_url)
+        self.assertEqual(response.context['page'][0].comments_count, 1)
+
+    def test_version_bump_without_signals_purges_pages(self):
+        """Страница сверяется с версиями постов, а не с сигналами."""
+        self.assertCached(self.group_url)
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Текст без сигнала', version=F('version') + 1)
+        self.assertContains(self.client.get(self.group_url),
+                            'Текст без сигнала')
+
+    def test_conditional_get_returns_304(self):
+        response = self.client.get(self.index)
+        self.assertIn('max-age=0', response['Cache-Control'])
+        by_etag = self.client.get(
+            self.index, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(by_etag.status_code, 304)
+        by_date = self.client.get(
+            self.index, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(by_date.status_code, 304)
+
+
+class GroupFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_group')
+        cls.group = Group.objects.create(title='Большая', slug='big',
+                                         description='Много постов')
+        Post.objects.bulk_create(
+            Post(text=f'Пост группы {number}', author=cls.author,
+                 group=cls.group)
+            for number in range(25))
+        cls.url = reverse('posts:groups', args=['big'])
+
+    def setUp(self):
+        get_cache().clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_whole_group_is_browsable_by_cursor(self):
+        """Лента группы не обрезана: курсоры проходят все посты."""
+        seen = []
+        data = {}
+        while True:
+            page = self.author_client.get(self.url, data).context['page']
+            seen.extend(post.pk for post in page)
+            if not page.next_cursor:
+                break
+            data = {'cursor': page.next_cursor}
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_group_header_is_cached_until_group_changes(self):
+        """Шапка группы с числом постов берётся из кэша."""
+        response = self.author_client.get(self.url)
+        self.assertContains(response, 'Записей: 25')
+        with self.assertNumQueries(0):
+            self.assertEqual(pagecache.group_header('big').posts_count, 25)
+        other = Group.objects.create(title='Другая', slug='small')
+        post = Post.objects.filter(group=self.group).first()
+        post.group = other
+        post.save()
+        self.assertContains(self.author_client.get(self.url), 'Записей: 24')
+        self.assertContains(
+            self.author_client.get(reverse('posts:groups', args=['small'])),
+            'Записей: 1')
+        self.group.description = 'Новое описание'
+        self.group.save()
+        self.assertContains(self.author_client.get(self.url),
+                            'Новое описание')
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+from posts.stemmer import stem
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        # Тесты правят и удаляют посты: объекты свои у каждого теста
+        self.author = User.objects.create_user(username='Konst_search')
+        self.group = Group.objects.create(title='Пчеловоды', slug='bees')
+        self.honey = Post.objects.create(
+            text='Собрали мёд с пасеки', author=self.author,
+            group=self.group)
+        self.other = Post.objects.create(
+            text='Про погоду', author=self.author)
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['page'].object_list)
+
+    def test_search_covers_posts_comments_and_groups(self):
+        self.assertEqual(self.found('пасеки'), [self.honey])
+        self.assertEqual(self.found('пчело'), [self.honey])
+        Comment.objects.create(text='Отличный дождь', author=self.author,
+                               post=self.other)
+        self.assertEqual(self.found('дождь'), [self.other])
+        self.assertEqual(self.found(''), [])
+        # Синтаксис FTS5 в запросе не ломает поиск
+        self.assertEqual(self.found('"мёд" OR ('), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.honey.text = 'Продали воск'
+        self.honey.save()
+        self.assertEqual(self.found('пасеки'), [])
+        self.assertEqual(self.found('воск'), [self.honey])
+        self.group.title = 'Садоводы'
+        self.group.save()
+        self.assertEqual(self.found('садоводы'), [self.honey])
+        self.group.delete()
+        self.assertEqual(self.found('садоводы'), [])
+        self.other.delete()
+        self.assertEqual(self.found('погоду'), [])
+
+    def test_post_text_ranks_above_comments(self):
+        Comment.objects.create(text='Погоду обещают хорошую',
+                               author=self.author, post=self.honey)
+        self.assertEqual(self.found('погоду'), [self.other, self.honey])
+
+    def test_admin_search_uses_index(self):
+        request = RequestFactory().get('/admin/posts/post/')
+        admin = site._registry[Post]
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'пасек')
+        self.assertEqual(list(queryset), [self.honey])
+        self.assertFalse(distinct)
+
+    def test_rebuild_search(self):
+        call_command('rebuild_search', stdout=StringIO())
+        self.assertEqual(self.found('мёд'), [self.honey])
+
+    def test_unbuilt_index_falls_back_to_text_search(self):
+        """Пока индекс не пересобран после миграций, ищем по тексту."""
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_search')
+            cursor.execute('DELETE FROM posts_search_state')
+        self.assertEqual(self.found('пасеки'), [self.honey])
+        self.assertEqual(self.found('пасека'), [])
+        call_command('rebuild_search', stdout=StringIO())
+        self.assertEqual(self.found('пасека'), [self.honey])
+
+    def test_russian_forms_and_transliteration(self):
+        """Поиск находит словоформы, «ё» как «е» и запросы транслитом."""
+        post = Post.objects.create(text='Делимся постами про ёжиков',
+                                   author=self.author)
+        self.assertEqual(self.found('пост'), [post])
+        self.assertEqual(self.found('ежик'), [post])
+        self.assertEqual(self.found('postami'), [post])
+        self.assertEqual(self.found('ПОСТЫ'), [post])
+        Comment.objects.create(text='Красивые фотографии',
+                               author=self.author, post=self.other)
+        self.assertEqual(self.found('красивая фотография'), [self.other])
+
+
+class StemmerTest(TestCase):
+    def test_stems(self):
+        stems = {
+            'постами': 'пост', 'посты': 'пост', 'поста': 'пост',
+            'красивейший': 'красив', 'говорилось': 'говор',
+            'важность': 'важност', 'книгой': 'книг',
+        }
+        for word, expected in stems.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
@@ -0,0 +1,89 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+STATIC_DIR = tempfile.mkdtemp()
+STATIC_ROOT = tempfile.mkdtemp()
+MEDIA_ROOT = tempfile.mkdtemp()
+STYLE = 'body { color: #333; }\n' * 100
+
+
+@override_settings(STATICFILES_DIRS=[STATIC_DIR], STATIC_ROOT=STATIC_ROOT,
+                   MEDIA_ROOT=MEDIA_ROOT)
+class FileServingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(os.path.join(STATIC_DIR, 'site.css'), 'w') as style:
+            style.write(STYLE)
+        with open(os.path.join(MEDIA_ROOT, 'clip.bin'), 'wb') as clip:
+            clip.write(bytes(range(256)) * 4)
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        for directory in (STATIC_DIR, STATIC_ROOT, MEDIA_ROOT):
+            shutil.rmtree(directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def static(self, name):
+        return Template('{% load static %}{% static name %}').render(
+            Context({'name': name}))
+
+    def test_hashed_static_is_immutable(self):
+        """{% static %} даёт имя с хешем, оно кэшируется навсегда."""
+        url = self.static('site.css')
+        self.assertRegex(url, r'^/static/site\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(), STYLE)
+
+    def test_precompressed_copy_is_served(self):
+        url = self.static('site.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            STYLE)
+
+    def test_missing_manifest_entry_does_not_break_static_tag(self):
+        self.assertEqual(self.static('not-collected.js'),
+                         '/static/not-collected.js')
+
+    def test_media_range_requests(self):
+        """Диапазоны байт медиа отдаются ответом 206."""
+        response = self.client.get('/media/clip.bin',
+                                   HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(10, 20)))
+        response = self.client.get('/media/clip.bin',
+                                   HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(252, 256)))
+        response = self.client.get('/media/clip.bin',
+                                   HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_conditional_get_returns_304(self):
+        response = self.client.get('/media/clip.bin')
+        self.assertIn('max-age', response['Cache-Control'])
+        response = self.client.get('/media/clip.bin',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_paths_outside_root_are_not_served(self):
+        response = self.client.get('/media/../../etc/passwd')
+        self.assertEqual(response.status_code, 404)
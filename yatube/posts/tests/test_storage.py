@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.models import ImageJob, Post, Rendition, StoredFile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name='photo.png', color=(255, 0, 0)):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DeduplicatingStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_storage')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def new_post(self, image):
+        self.author_client.post(reverse('posts:new_post'),
+                                {'text': 'Пост', 'image': image})
+        return Post.objects.latest('pk')
+
+    def test_same_image_is_stored_once(self):
+        """Одинаковое содержимое хранится одним файлом."""
+        first = self.new_post(make_image('first.png'))
+        second = self.new_post(make_image('second.png'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(os.listdir(os.path.join(MEDIA_ROOT, 'posts')),
+                         ['first.png'])
+        self.assertEqual(StoredFile.objects.get().refcount, 2)
+
+    def test_duplicate_reuses_renditions(self):
+        """Превью дубля копируются, а не режутся заново."""
+        first = self.new_post(make_image('first.png'))
+        images.drain()
+        second = self.new_post(make_image('second.png'))
+        self.assertFalse(ImageJob.objects.filter(post=second).exists())
+        self.assertEqual(
+            set(Rendition.objects.filter(post=second).values_list('file')),
+            set(Rendition.objects.filter(post=first).values_list('file')))
+
+    def test_replace_and_delete_release_references(self):
+        post = self.new_post(make_image())
+        old = post.image.name
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.author.username,
+                                             post.pk]),
+            {'text': 'Пост', 'image': make_image('new.png', (0, 0, 255))})
+        self.assertEqual(StoredFile.objects.get(name=old).refcount, 0)
+        post.refresh_from_db()
+        post.delete()
+        self.assertEqual(
+            StoredFile.objects.get(name=post.image.name).refcount, 0)
+
+    def test_gc_media_removes_orphans_only(self):
+        kept = self.new_post(make_image('kept.png'))
+        images.drain()
+        dropped = self.new_post(make_image('dropped.png', (0, 255, 0)))
+        images.drain()
+        dropped_renditions = list(Rendition.objects.filter(
+            post=dropped).values_list('file', flat=True))
+        dropped.delete()
+        call_command('gc_media', grace=0, stdout=StringIO())
+        storage = Post._meta.get_field('image').storage
+        self.assertTrue(storage.exists(kept.image.name))
+        self.assertFalse(storage.exists(dropped.image.name))
+        self.assertFalse(StoredFile.objects.filter(
+            name=dropped.image.name).exists())
+        for name in dropped_renditions:
+            self.assertFalse(storage.exists(name))
+        for rendition in Rendition.objects.filter(post=kept):
+            self.assertTrue(rendition.file.storage.exists(
+                rendition.file.name))
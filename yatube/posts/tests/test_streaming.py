@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.caching import get_cache
+from posts.models import Follow, Post
+
+
+@override_settings(STREAM_FEEDS=True)
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_stream')
+        cls.reader = User.objects.create_user(username='Reader_stream')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(text=f'Поток {number}', author=cls.author)
+            for number in range(3))
+
+    def setUp(self):
+        get_cache().clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_feeds_are_streamed_head_first(self):
+        """Шапка страницы уходит до карточек, карточки — по одной."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                head = next(iter(response.streaming_content)).decode()
+                self.assertIn('<nav', head)
+                self.assertNotIn('Поток', head)
+                content = self.read(response)
+                for number in range(3):
+                    self.assertIn(f'Поток {number}', content)
+                self.assertNotIn('<!-- post-cards -->', content)
+
+    def test_head_is_sent_before_feed_query(self):
+        """Запрос ленты выполняется, когда шапка уже отдана."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                chunks = iter(self.reader_client.get(url).streaming_content)
+                with CaptureQueriesContext(connection) as head:
+                    next(chunks)
+                self.assertFalse(
+                    [query['sql'] for query in head.captured_queries
+                     if '"posts_post"' in query['sql']])
+                with CaptureQueriesContext(connection) as rest:
+                    b''.join(chunks)
+                self.assertTrue(
+                    [query['sql'] for query in rest.captured_queries
+                     if '"posts_post"' in query['sql']])
+
+    def test_streamed_anonymous_page_is_cached(self):
+        """Потоковая страница попадает в кэш, когда допишется."""
+        url = reverse('posts:index')
+        content = self.read(self.client.get(url))
+        # Из базы читаются только версии постов страницы
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.content.decode(), content)
+        self.assertIn('ETag', response)
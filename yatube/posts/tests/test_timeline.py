@@ -0,0 +1,193 @@
+import datetime as dt
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import metrics
+from posts.models import Follow, Post, Timeline, TimelineEntry, UserCounter
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Konst_reader')
+        cls.author = User.objects.create_user(username='Konst_author')
+        cls.other = User.objects.create_user(username='Konst_other')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, author, count):
+        start = dt.datetime(2022, 5, 1, tzinfo=dt.timezone.utc)
+        posts = []
+        for i in range(count):
+            post = Post.objects.create(text=f'{i} Пост', author=author)
+            post.pub_date = start + dt.timedelta(minutes=i)
+            Post.objects.filter(pk=post.pk).update(pub_date=post.pub_date)
+            TimelineEntry.objects.filter(post=post).update(
+                pub_date=post.pub_date)
+            posts.append(post)
+        return posts
+
+    def feed(self, cursor=None):
+        data = {'cursor': cursor} if cursor else {}
+        return self.client.get(
+            reverse('posts:follow_index'), data).context['page']
+
+    def walk(self):
+        seen = []
+        page = self.feed()
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                return seen
+            page = self.feed(page.next_cursor)
+
+    def expected(self):
+        return list(Post.objects.filter(
+            author__following__user=self.reader).order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+
+    def test_cold_user_is_served_by_join_and_warmed(self):
+        """Холодная лента отдаётся через Follow и собирается."""
+        self.create_posts(self.author, 3)
+        self.assertEqual(
+            [post.pk for post in self.feed()], self.expected())
+        self.assertTrue(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3)
+
+    def test_new_post_is_fanned_out_to_warm_followers(self):
+        """Новый пост попадает в готовую ленту подписчика."""
+        self.feed()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            [post.pk])
+
+    def test_warm_feed_does_not_join_follow(self):
+        """Тёплая лента читается из TimelineEntry без соединения Follow
+        и Post."""
+        self.create_posts(self.author, 3)
+        self.feed()
+        with CaptureQueriesContext(connection) as queries:
+            page = self.feed()
+        self.assertEqual([post.pk for post in page], self.expected())
+        self.assertFalse(any(
+            'posts_follow' in query['sql'] and 'posts_post' in query['sql']
+            for query in queries))
+
+    def test_follow_backfills_and_unfollow_forgets(self):
+        """Подписка дополняет ленту постами автора, отписка убирает их."""
+        self.feed()
+        other_posts = self.create_posts(self.other, 2)
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.other.username]))
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            {post.pk for post in other_posts})
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.other.username]))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(TIMELINE_DEPTH=5)
+    def test_depth_is_capped_and_deeper_pages_use_join(self):
+        """Лента хранит TIMELINE_DEPTH постов, глубже — запрос через Follow."""
+        self.create_posts(self.author, 12)
+        self.feed()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5)
+        self.assertEqual(self.walk(), self.expected())
+
+    @override_settings(TIMELINE_DEPTH=5, POSTS_PER_PAGE=3)
+    def test_newer_pages_below_depth_use_join(self):
+        """Листая назад из глубины, посты между курсором и лентой
+        не пропадают."""
+        self.create_posts(self.author, 20)
+        page = self.feed()
+        pages = []
+        while True:
+            pages.append([post.pk for post in page])
+            if not page.has_next():
+                break
+            page = self.feed(page.next_cursor)
+        back = [pages[-1]]
+        while page.has_previous():
+            page = self.feed(page.previous_cursor)
+            back.append([post.pk for post in page])
+        self.assertEqual(back, pages[::-1])
+
+
+@override_settings(TIMELINE_FANOUT_THRESHOLD=1)
+class HybridTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Konst_reader')
+        cls.fan = User.objects.create_user(username='Konst_fan')
+        cls.star = User.objects.create_user(username='Konst_star')
+        cls.author = User.objects.create_user(username='Konst_author')
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        UserCounter.objects.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset(metrics.TIMELINE)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        # Собираем ленту, чтобы дальше посты шли через разнос
+        self.client.get(reverse('posts:follow_index'))
+
+    def test_popular_author_is_not_fanned_out(self):
+        """Посты автора выше порога не пишутся в ленты подписчиков."""
+        Post.objects.create(text='Пост звезды', author=self.star)
+        post = Post.objects.create(text='Обычный пост', author=self.author)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            [post.pk])
+
+    def test_author_dropping_below_threshold_is_backfilled(self):
+        """Посты, вышедшие пока автор был выше порога, остаются
+        в ленте, когда он опускается до порога."""
+        post = Post.objects.create(text='Пост звезды', author=self.star)
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page'])
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента сливает разнесённые и дочитанные посты по дате."""
+        start = dt.datetime(2022, 5, 1, tzinfo=dt.timezone.utc)
+        for i in range(12):
+            author = self.star if i % 3 else self.author
+            post = Post.objects.create(text=f'{i} Пост', author=author)
+            pub_date = start + dt.timedelta(minutes=i)
+            Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+            TimelineEntry.objects.filter(post=post).update(pub_date=pub_date)
+        expected = list(Post.objects.filter(
+            author__following__user=self.reader).order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+        first = self.client.get(reverse('posts:follow_index'))
+        page = first.context['page']
+        second = self.client.get(
+            reverse('posts:follow_index'), {'cursor': page.next_cursor})
+        seen = [post.pk for post in page]
+        seen += [post.pk for post in second.context['page']]
+        self.assertEqual(seen, expected)
+        served = metrics.get(metrics.TIMELINE)
+        self.assertEqual(served[metrics.PUSH], 4)
+        self.assertEqual(served[metrics.PULL], 8)
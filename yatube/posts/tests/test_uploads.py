@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(400, 300), image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (0, 128, 255)).save(buffer, image_format)
+    return SimpleUploadedFile(f'photo.{image_format.lower()}',
+                              buffer.getvalue(),
+                              content_type=Image.MIME[image_format])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_MAX_SIDE=None)
+class UploadLimitsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_upload')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def upload(self, image):
+        return self.author_client.post(
+            reverse('posts:new_post'), {'text': 'Пост', 'image': image})
+
+    def test_oversized_upload_is_rejected(self):
+        """Файл больше UPLOAD_MAX_SIZE отвергается с ошибкой в форме."""
+        image = make_image()
+        with self.settings(UPLOAD_MAX_SIZE=image.size // 2):
+            response = self.upload(image)
+        self.assertFalse(Post.objects.exists())
+        error, = response.context['form'].errors['image']
+        self.assertTrue(error.startswith('Файл больше'))
+
+    def test_too_many_pixels_is_rejected(self):
+        """Размеры проверяются по заголовку картинки."""
+        with self.settings(IMAGE_MAX_PIXELS=10 ** 4):
+            response = self.upload(make_image())
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_fully_decoded_formats_have_lower_pixel_limit(self):
+        """PNG декодируется целиком, и предел для него ниже, чем для JPEG."""
+        with self.settings(IMAGE_MAX_PIXELS=10 ** 6,
+                           IMAGE_MAX_DECODED_PIXELS=10 ** 4):
+            response = self.upload(make_image(image_format='PNG'))
+            self.assertTrue(response.context['form'].errors['image'])
+            self.upload(make_image())
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_large_image_is_downscaled(self):
+        for image_format in ('JPEG', 'PNG'):
+            with self.subTest(image_format=image_format):
+                with self.settings(IMAGE_MAX_SIDE=100):
+                    self.upload(make_image(image_format=image_format))
+                post = Post.objects.latest('pk')
+                with Image.open(post.image) as image:
+                    self.assertEqual(image.size, (100, 75))
+                    self.assertEqual(image.format, image_format)
+
+    def test_small_image_is_kept(self):
+        self.upload(make_image())
+        with Image.open(Post.objects.get().image) as image:
+            self.assertEqual(image.size, (400, 300))
@@ -4,12 +4,15 @@ import tempfile
 from django.contrib.auth.models import User
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Post, Group, Follow, Comment
+from posts import timeline
+from posts.models import Post, Group, Follow, Comment, UserCounter
 from django import forms
 import datetime as dt
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
@@ -391,6 +394,125 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_cursor')
+        Post.objects.bulk_create([
+            Post(text=f'{i} Текст поста для курсора', author=cls.author)
+            for i in range(1, 26)
+        ])
+        # Одинаковая дата у всех постов: порядок держится только на id
+        Post.objects.update(
+            pub_date=dt.datetime(2022, 5, 1, tzinfo=dt.timezone.utc))
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, cursor=None):
+        data = {'cursor': cursor} if cursor else {}
+        return self.client.get(reverse('posts:index'), data).context['page']
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """По курсорам «старее» лента проходится целиком и без повторов."""
+        seen = []
+        page = self.get_page()
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.get_page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(page.number, 3)
+
+    def test_previous_cursor_returns_newer_page(self):
+        """Курсор «новее» возвращает предыдущую страницу."""
+        first = self.get_page()
+        second = self.get_page(first.next_cursor)
+        back = self.get_page(second.previous_cursor)
+        self.assertEqual(
+            [post.pk for post in back], [post.pk for post in first])
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_page_does_not_count(self):
+        """Страница по курсору не выполняет COUNT(*) и OFFSET."""
+        first = self.get_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(first.next_cursor)
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertNotIn('COUNT(*)', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        page = self.get_page('не-курсор')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(
+            [post.pk for post in page], self.expected[:10])
+
+    def test_page_number_still_resolves(self):
+        """Старые ссылки ?page=N продолжают работать."""
+        response = self.client.get(reverse('posts:index') + '?page=3')
+        self.assertEqual(
+            [post.pk for post in response.context['page']],
+            self.expected[20:])
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Konst_feed')
+        cls.reader = User.objects.create_user(username='Konst_reader')
+        cls.group = Group.objects.create(title='feed', slug='feed-slug')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(10):
+            post = Post.objects.create(
+                text=f'{i} Пост ленты', author=cls.author, group=cls.group)
+            for _ in range(i):
+                Comment.objects.create(
+                    text='Комментарий', author=cls.reader, post=post)
+        UserCounter.objects.rebuild()
+        timeline.build(cls.reader)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def count_queries(self, url, per_page):
+        cache.clear()
+        with self.settings(POSTS_PER_PAGE=per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(len(response.context['page']), per_page)
+        return len(queries)
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не растёт с числом постов на странице."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:groups', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(url, 1),
+                    self.count_queries(url, 10))
+
+    def test_feed_comments_count(self):
+        """Число комментариев приходит вместе с постом."""
+        response = self.client.get(reverse('posts:index'))
+        for post in response.context['page']:
+            with self.subTest(post=post.pk):
+                self.assertEqual(
+                    post.comments_count, post.comments.count())
+
+
 class CacheTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -406,13 +528,21 @@ class CacheTests(TestCase):
         self.authorized_client.force_login(self.user)
 
     def test_cache(self):
-        """Проверяется работа кэширования страницы index.html"""
+        """Карточки index.html кэшируются, но правка видна сразу."""
         one = self.authorized_client.get(reverse('posts:index'))
-        post1 = Post.objects.get(pk=1)
-        post1.text = 'Измененный текст'
-        post1.save()
         two = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(one.content, two.content)
-        cache.clear()
+        post1 = Post.objects.get(pk=self.post1.pk)
+        post1.text = 'Измененный текст'
+        post1.save()
         three = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotEqual(one.content, three.content)
+        self.assertContains(three, 'Измененный текст')
+
+    def test_cache_does_not_leak_author_card(self):
+        """Другой пользователь не получает карточку автора
+        с кнопкой редактирования."""
+        self.authorized_client.get(reverse('posts:index'))
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='Konst_reader'))
+        response = reader.get(reverse('posts:index'))
+        self.assertNotContains(response, '/edit/')
@@ -0,0 +1,240 @@
+"""
+Лента подписок с разносом постов при записи (fan-out on write).
+
+Новый пост сразу записывается в TimelineEntry всех «тёплых»
+подписчиков, и follow_index читает страницу по индексу
+(user, pub_date, post) вместо соединения Follow и Post.
+В ленте хранится не больше TIMELINE_DEPTH последних постов:
+всё, что глубже, и ленты «холодных» пользователей отдаются
+старым запросом через Follow.
+
+Посты авторов, у которых больше TIMELINE_FANOUT_THRESHOLD
+подписчиков, по лентам не разносятся: их дочитывают при чтении
+и сливают с готовой лентой по (pub_date, id). Когда автор опускается
+до порога, его последние посты переносятся в готовые ленты
+подписчиков (unpull), иначе вышедшие, пока он был выше, пропали бы.
+"""
+import heapq
+
+from django.conf import settings
+
+from . import metrics
+from .models import Follow, Post, Timeline, TimelineEntry, UserCounter
+from .paginator import CursorPaginator, keyset_slice, paginate
+
+# Лента подрезается, когда вырастает на столько записей сверх глубины
+TRIM_SLACK = 50
+
+
+def following_posts(user):
+    """Посты авторов, на которых подписан user, — запасной путь."""
+    return Post.objects.feed().filter(author__following__user=user)
+
+
+def entries_for(user_id, posts):
+    return [
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for post in posts
+    ]
+
+
+def is_pulled(author_id):
+    """Посты автора дочитываются при чтении, а не разносятся."""
+    return UserCounter.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_THRESHOLD,
+    ).exists()
+
+
+def pulled_authors(user):
+    """Авторы из подписок user, чьи посты дочитываются при чтении."""
+    return Follow.objects.filter(
+        user=user,
+        author__counter__followers_count__gt=(
+            settings.TIMELINE_FANOUT_THRESHOLD),
+    ).values_list('author_id', flat=True)
+
+
+def fan_out(post):
+    """Добавляет новый пост в готовые ленты подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+        user__timeline__isnull=False,
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post.pk,
+                       author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers],
+        batch_size=500, ignore_conflicts=True)
+
+
+def latest(posts):
+    """Последние TIMELINE_DEPTH постов и признак, что были и старше."""
+    depth = settings.TIMELINE_DEPTH
+    posts = list(posts.order_by('-pub_date', '-pk')[:depth])
+    return posts, len(posts) == depth
+
+
+def backfill(user_id, author_id):
+    """После подписки переносит в ленту последние посты автора."""
+    if (not Timeline.objects.filter(user_id=user_id).exists()
+            or is_pulled(author_id)):
+        return
+    posts, truncated = latest(Post.objects.filter(author_id=author_id))
+    TimelineEntry.objects.bulk_create(
+        entries_for(user_id, posts), batch_size=500, ignore_conflicts=True)
+    if truncated:
+        Timeline.objects.filter(user_id=user_id).update(truncated=True)
+    trim(user_id, slack=0)
+
+
+def unpull(author_id):
+    """
+    После отписки: если автор опустился до порога, его посты снова
+    разносятся при записи, а уже вышедшие переносятся в готовые ленты.
+    """
+    followers_count = UserCounter.objects.filter(
+        user_id=author_id).values_list('followers_count', flat=True).first()
+    if followers_count != settings.TIMELINE_FANOUT_THRESHOLD:
+        return
+    followers = list(Follow.objects.filter(
+        author_id=author_id,
+        user__timeline__isnull=False,
+    ).values_list('user_id', flat=True))
+    if not followers:
+        return
+    posts, truncated = latest(Post.objects.filter(author_id=author_id))
+    TimelineEntry.objects.bulk_create(
+        [entry for user_id in followers
+         for entry in entries_for(user_id, posts)],
+        batch_size=500, ignore_conflicts=True)
+    if truncated:
+        Timeline.objects.filter(user_id__in=followers).update(truncated=True)
+
+
+def forget(user_id, author_id):
+    """После отписки убирает посты автора из ленты."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id).delete()
+
+
+def trim(user_id, slack=TRIM_SLACK):
+    """Оставляет в ленте не больше TIMELINE_DEPTH последних постов."""
+    entries = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id')
+    depth = settings.TIMELINE_DEPTH
+    if not entries[depth + slack:depth + slack + 1].exists():
+        return
+    last = entries.values_list('pub_date', 'post_id')[depth - 1]
+    stale = keyset_slice(entries, last, CursorPaginator.OLDER, None,
+                         id_field='post_id')
+    TimelineEntry.objects.filter(pk__in=stale.values('pk')).delete()
+    Timeline.objects.filter(user_id=user_id).update(truncated=True)
+
+
+def build(user):
+    """Собирает ленту «холодного» пользователя из последних постов."""
+    posts, truncated = latest(
+        Post.objects.filter(author__following__user=user))
+    TimelineEntry.objects.bulk_create(
+        entries_for(user.pk, posts), batch_size=500, ignore_conflicts=True)
+    Timeline.objects.update_or_create(
+        user=user, defaults={'truncated': truncated})
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Курсорный paginator ленты подписок. Для тёплых пользователей
+    страницы читаются из TimelineEntry по диапазону ключа, а если
+    готовой ленты не хватило — дочитываются через Follow.
+    Страницы ?page=N по-прежнему считаются через Follow.
+    """
+
+    def __init__(self, object_list, per_page, user=None, **kwargs):
+        self.user = user
+        self.timeline = Timeline.objects.filter(user=user).first()
+        self.warm = self.timeline is not None
+        super().__init__(object_list, per_page, **kwargs)
+
+    def fetch(self, position, direction, limit):
+        if not self.warm or self.below_timeline(position, direction):
+            return self.tag(
+                super().fetch(position, direction, limit), metrics.JOIN)
+        entries = TimelineEntry.objects.filter(user=self.user)
+        ids = list(keyset_slice(
+            entries, position, direction, limit,
+            id_field='post_id').values_list('post_id', flat=True))
+        posts = Post.objects.feed().in_bulk(ids)
+        pushed = self.tag(
+            [posts[pk] for pk in ids if pk in posts], metrics.PUSH)
+        sources = [pushed]
+        pulled = list(pulled_authors(self.user))
+        if pulled:
+            sources.append(self.tag(keyset_slice(
+                Post.objects.feed().filter(author_id__in=pulled),
+                position, direction, limit), metrics.PULL))
+        if (len(ids) < limit and direction == self.OLDER
+                and self.timeline.truncated):
+            # Готовая лента кончилась: дальше — посты глубже TIMELINE_DEPTH
+            last = self.key(pushed[-1]) if pushed else position
+            sources.append(self.tag(
+                super().fetch(last, direction, limit), metrics.JOIN))
+        return self.merge(sources, direction, limit)
+
+    def below_timeline(self, position, direction):
+        """
+        Курсор «новее» ниже подрезанной ленты: посты между ним
+        и самой старой записью ленты есть только в запросе через Follow.
+        """
+        if (direction != self.NEWER or position is None
+                or not self.timeline.truncated):
+            return False
+        oldest = TimelineEntry.objects.filter(user=self.user).order_by(
+            'pub_date', 'post_id').values_list('pub_date', 'post_id').first()
+        return oldest is None or tuple(position) < oldest
+
+    def merge(self, sources, direction, limit):
+        """
+        k-way слияние отсортированных источников по (pub_date, id).
+        Пост, пришедший из нескольких источников, берётся один раз.
+        """
+        rows, seen = [], set()
+        merged = heapq.merge(*sources, key=self.key,
+                             reverse=direction == self.OLDER)
+        for post in merged:
+            if post.pk in seen:
+                continue
+            seen.add(post.pk)
+            rows.append(post)
+            if len(rows) == limit:
+                break
+        return rows
+
+    @staticmethod
+    def tag(posts, source):
+        """Помечает, каким путём пост попал в ленту, — для метрик."""
+        posts = list(posts)
+        for post in posts:
+            post.timeline_source = source
+        return posts
+
+
+def paginate_timeline(request):
+    """
+    Страница ленты подписок. Ленту «холодного» пользователя
+    отдаём через Follow и сразу собираем для следующих запросов.
+    """
+    user = request.user
+    page = paginate(request, following_posts(user),
+                    paginator_class=TimelinePaginator, user=user)
+    metrics.incr_many(
+        getattr(post, 'timeline_source', metrics.JOIN) for post in page)
+    if page.paginator.warm:
+        if page.number == 1:
+            trim(user.pk)
+    else:
+        build(user)
+    return page
@@ -0,0 +1,105 @@
+"""
+Загрузка картинок без лишней памяти.
+
+LimitedUploadHandler стоит первым в FILE_UPLOAD_HANDLERS и видит
+каждый кусок файла раньше штатных обработчиков. Если запрос заявляет
+длину больше UPLOAD_MAX_SIZE или файл на деле её превысил, остаток
+файла читается и выбрасывается, а вместо файла в request.FILES
+попадает RejectedUpload: форма покажет ошибку у своего поля.
+
+Картинку, прошедшую по размеру, PostForm проверяет по заголовку
+(Pillow не декодирует её целиком, чтобы узнать размеры) и при
+необходимости уменьшает до IMAGE_MAX_SIDE (shrink). JPEG уменьшается
+уже при декодировании, остальные форматы разворачиваются в памяти
+целиком, поэтому предел пикселей для них ниже.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            UploadedFile)
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Какие форматы уменьшаются; пересохраняются они в том же формате
+SHRINK_FORMATS = ('JPEG', 'PNG', 'WEBP')
+# Какие форматы декодируются сразу в уменьшенном масштабе (draft)
+DRAFT_FORMATS = ('JPEG',)
+JPEG_QUALITY = 90
+
+
+class RejectedUpload(UploadedFile):
+    """Место отвергнутого файла в request.FILES; данных в нём нет."""
+
+    def __init__(self, name, content_type, size, reason):
+        super().__init__(BytesIO(), name, content_type, size)
+        self.reason = reason
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # Заявленная длина тела больше предела: файлы даже не пишем
+        self.too_large = content_length > settings.UPLOAD_MAX_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.rejected = self.too_large
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_SIZE:
+            self.rejected = True
+        # Отвергнутый файл дальше по цепочке обработчиков не идёт
+        return None if self.rejected else raw_data
+
+    def file_complete(self, file_size):
+        if not self.rejected:
+            return None
+        reason = (f'Файл больше '
+                  f'{filesizeformat(settings.UPLOAD_MAX_SIZE)}')
+        return RejectedUpload(self.file_name, self.content_type,
+                              self.received, reason)
+
+
+def check_dimensions(image):
+    """
+    Проверяет размеры картинки, открытой Image.open: они известны
+    из заголовка, декодировать пиксели для этого не нужно.
+    """
+    width, height = image.size
+    limit = (settings.IMAGE_MAX_PIXELS if image.format in DRAFT_FORMATS
+             else settings.IMAGE_MAX_DECODED_PIXELS)
+    if width * height > limit:
+        return (f'Картинка {width}×{height} слишком большая: '
+                f'не больше {limit // 10**6} Мпикс')
+    return None
+
+
+def shrink(upload, image):
+    """
+    Уменьшает картинку, у которой сторона больше IMAGE_MAX_SIDE,
+    и возвращает новый файл; остальные возвращаются как есть.
+    JPEG декодируется сразу в уменьшенном масштабе (draft),
+    поэтому полный кадр в памяти не разворачивается.
+    """
+    max_side = settings.IMAGE_MAX_SIDE
+    if (not max_side or max(image.size) <= max_side
+            or image.format not in SHRINK_FORMATS):
+        return upload
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = image.format
+    params = {}
+    if image_format in DRAFT_FORMATS:
+        image.draft('RGB', (max_side, max_side))
+        params['quality'] = JPEG_QUALITY
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, image_format, **params)
+    return InMemoryUploadedFile(
+        buffer, getattr(upload, 'field_name', None), upload.name,
+        Image.MIME[image_format], buffer.tell(), None)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -10,6 +10,16 @@ urlpatterns = [
     path('group/<slug:slug>/',
          views.group_posts, name='groups'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
+    # JSON API: до шаблонов с <username>, иначе 'api' примут за автора
+    path('api/posts/', api.feed, name='api_feed'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('api/posts/<int:post_id>/comments/', api.post_comments,
+         name='api_comments'),
+    path('api/groups/<slug:slug>/posts/', api.group_feed,
+         name='api_group_feed'),
+    path('api/users/<str:username>/posts/', api.profile_feed,
+         name='api_profile_feed'),
     path(
         '<str:username>/follow/', views.profile_follow, name='profile_follow'),
     path(
@@ -22,6 +32,9 @@ urlpatterns = [
     path('<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments, name='post_comments'),
     path(
         '<username>/<int:post_id>/comment/',
         views.add_comment, name='add_comment'),
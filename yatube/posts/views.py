@@ -1,35 +1,46 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Post, Group, Follow
+from .models import Comment, Post, Follow, UserCounter
+from . import etags, pagecache, search
+from .streaming import LazyPage, render_feed
 from .forms import PostForm, CommentForm
+from .paginator import paginate
+from .timeline import paginate_timeline
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
 from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 
 
 User = get_user_model()
 
 
+@pagecache.anonymous_page_cache(lambda request: pagecache.INDEX)
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'posts/index.html', {'page': page})
+    post_list = Post.objects.feed()
+    page = LazyPage(paginate, request, post_list)
+    response = render_feed(request, 'posts/index.html', {'page': page})
+    return pagecache.tag_posts(response, page)
 
 
+@pagecache.anonymous_page_cache(
+    lambda request, slug: pagecache.group_scope(slug))
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()[:13]
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = pagecache.group_header(slug)
+    # Лента группы идёт по индексу (group, -pub_date, -id)
+    page = paginate(request, Post.objects.feed().filter(group=group))
     context = {'page': page, 'group': group}
-    return render(request, 'posts/group.html',
-                  context=context)
+    response = render(request, 'posts/group.html',
+                      context=context)
+    return pagecache.tag_posts(response, page)
 
 
 @login_required
+@transaction.atomic
 def new_post(request):
     title = 'Создать запись'
     button = 'Отправить'
@@ -66,41 +77,80 @@ def post_edit(request, username, post_id):
     return redirect(reverse('posts:post', kwargs=post_kwargs))
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search.SearchResults(query),
+                          settings.POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'posts/search.html',
+                  {'page': page, 'query': query})
+
+
+@cache_control(private=True, max_age=0, must_revalidate=True)
+@etag(etags.profile_etag)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    user_posts = Post.objects.filter(author=author).order_by('-pub_date')
-    posts_count = user_posts.count()
-    paginator = Paginator(user_posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    user_posts = Post.objects.feed().filter(author=author)
+    counter = UserCounter.objects.for_user(author)
+    page = LazyPage(paginate, request, user_posts)
     context = {
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': counter.posts_count,
         'page': page
     }
-    return render(request, 'posts/profile.html', context=context)
+    return render_feed(request, 'posts/profile.html', context)
 
 
+@cache_control(private=True, max_age=0, must_revalidate=True)
+@etag(etags.post_etag)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    author = get_object_or_404(User, username=username)
-    comments = post.comments.all()
-    posts_count = Post.objects.filter(author=author).count()
+    # Пост, его автор со счётчиками и группа — одним запросом;
+    # пост чужого автора по этому адресу не показывается
+    post = get_object_or_404(
+        Post.objects.select_related('author__counter', 'group'),
+        pk=post_id, author__username=username)
+    author = post.author
+    comments = paginate_comments(request, username, post_id)
+    # Строки счётчиков может ещё не быть: for_user её создаст
+    counter = (getattr(author, 'counter', None)
+               or UserCounter.objects.for_user(author))
     form = CommentForm(request.POST or None)
-    follower_count = author.follower.count()
-    following_count = author.following.count()
     context = {
         'post': post,
         'comments': comments,
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': counter.posts_count,
         'form': form,
-        'follower_count': follower_count,
-        'following_count': following_count,
+        'follower_count': counter.followers_count,
+        'following_count': counter.following_count,
     }
     return render(request, 'posts/post.html', context=context)
 
 
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев поста — фрагментом HTML."""
+    page = paginate_comments(request, username, post_id)
+    if not page and not Post.objects.filter(
+            pk=post_id, author__username=username).exists():
+        raise Http404('Пост не найден')
+    return render(request, 'posts/comment_list.html', {
+        'comments': page, 'username': username, 'post_id': post_id})
+
+
+def paginate_comments(request, username, post_id):
+    """
+    Страница комментариев по курсору (created, id), от новых к старым,
+    с авторами в том же запросе. Сколько бы ни было комментариев,
+    страница поста показывает только первые COMMENTS_PER_PAGE.
+    Пост чужого автора по этому адресу не даёт ни одного комментария.
+    """
+    comments = Comment.objects.filter(
+        post_id=post_id, post__author__username=username).select_related(
+        'author')
+    return paginate(request, comments, settings.COMMENTS_PER_PAGE,
+                    date_field='created')
+
+
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию,
     # выводить её в шаблон пользователской страницы 404 мы не станем
@@ -117,6 +167,7 @@ def server_error(request):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -131,14 +182,12 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {'page': page})
+    page = LazyPage(paginate_timeline, request)
+    return render_feed(request, 'follow.html', {'page': page})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
@@ -148,6 +197,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     get_object_or_404(
         Follow, user=request.user, author__username=username).delete()
@@ -0,0 +1,177 @@
+"""
+Раздача статики и медиа без внешнего веб-сервера.
+
+FileServingMiddleware стоит в начале MIDDLEWARE и отвечает на GET
+и HEAD под STATIC_URL и MEDIA_URL сам, не пропуская запрос через
+сессии, CSRF и прочий стек:
+
+* статика с хешем в имени кэшируется клиентами на год (immutable),
+  без хеша — на STATIC_MAX_AGE;
+* заранее сжатые копии (.br, .gz, см. yatube.storage) отдаются тем,
+  кто их принимает; на лету ничего не сжимается;
+* целый файл отдаётся через FileResponse, и WSGI-сервер может
+  отправить его sendfile (wsgi.file_wrapper);
+* поддерживаются ETag/Last-Modified и запросы диапазона (Range) —
+  по ним браузер докачивает и перематывает большие файлы.
+
+Файлов, которых нет на диске, middleware не касается: запрос идёт
+дальше по стеку как обычно.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .storage import COMPRESSIBLE, is_hashed
+
+# Сколько клиенты и прокси хранят файлы без хеша в имени
+STATIC_MAX_AGE = 60
+MEDIA_MAX_AGE = 60 * 60 * 24
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Сжатые копии в порядке предпочтения
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, из которого читается только диапазон [start, end]."""
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class FileServingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            response = self.serve(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request):
+        roots = (
+            (settings.STATIC_URL, settings.STATIC_ROOT, True),
+            (settings.MEDIA_URL, settings.MEDIA_ROOT, False),
+        )
+        for url, root, is_static in roots:
+            if url and root and request.path.startswith(url):
+                return self.serve_file(
+                    request, root, request.path[len(url):], is_static)
+        return None
+
+    def serve_file(self, request, root, name, is_static):
+        try:
+            path = safe_join(root, name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type, _ = mimetypes.guess_type(path)
+        path, headers = self.file_headers(request, path, name, is_static)
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers['ETag'] = etag
+        headers['Last-Modified'] = http_date(stat.st_mtime)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime))
+        if not_modified is not None:
+            return self.with_headers(not_modified, headers)
+        byte_range = self.parse_range(request, etag, stat.st_size)
+        if byte_range == 'invalid':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return self.with_headers(response, headers)
+        start, end = byte_range or (0, stat.st_size - 1)
+        if request.method == 'HEAD':
+            response = HttpResponse()
+        elif byte_range:
+            response = FileResponse(RangeFile(open(path, 'rb'), start, end))
+        else:
+            response = FileResponse(open(path, 'rb'))
+        # Тип — по исходному имени, а не по .gz/.br сжатой копии
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+        return self.with_headers(response, headers)
+
+    def file_headers(self, request, path, name, is_static):
+        """Путь к отдаваемой копии файла и заголовки кэширования."""
+        headers = {'Accept-Ranges': 'bytes'}
+        if is_static and path.endswith(COMPRESSIBLE):
+            headers['Vary'] = 'Accept-Encoding'
+            path, encoding = self.choose_encoding(request, path)
+            if encoding:
+                headers['Content-Encoding'] = encoding
+        if is_static and is_hashed(name):
+            headers['Cache-Control'] = IMMUTABLE
+        else:
+            max_age = STATIC_MAX_AGE if is_static else MEDIA_MAX_AGE
+            headers['Cache-Control'] = f'public, max-age={max_age}'
+        return path, headers
+
+    @staticmethod
+    def choose_encoding(request, path):
+        accepted = {
+            token.split(';')[0].strip()
+            for token in request.META.get(
+                'HTTP_ACCEPT_ENCODING', '').split(',')}
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+    @staticmethod
+    def parse_range(request, etag, size):
+        """
+        (start, end) из заголовка Range, None — отдать файл целиком,
+        'invalid' — диапазон за пределами файла. Несколько диапазонов
+        сразу не поддерживаются: на них отдаётся файл целиком.
+        """
+        header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not header or (if_range and if_range != etag):
+            return None
+        match = RANGE.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first and last and int(last) < int(first):
+            return None
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # bytes=-N — последние N байт
+            start, end = max(size - int(last), 0), size - 1
+        if start > end or start >= size:
+            return 'invalid'
+        return start, end
+
+    @staticmethod
+    def with_headers(response, headers):
+        for header, value in headers.items():
+            response[header] = value
+        return response
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yatube.middleware.FileServingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -137,6 +138,10 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR,
                            'static')
 
+# Имена с хешем содержимого и сжатые копии (yatube.storage);
+# отдаёт статику и медиа yatube.middleware.FileServingMiddleware
+STATICFILES_STORAGE = 'yatube.storage.CompressedManifestStaticFilesStorage'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -149,8 +154,69 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Количество постов на странице ленты
+POSTS_PER_PAGE = 10
+# Количество комментариев на странице поста и в одной подгрузке
+COMMENTS_PER_PAGE = 20
+
+# Сколько последних постов хранится в готовой ленте подписок
+TIMELINE_DEPTH = 500
+# У авторов с большим числом подписчиков посты не разносятся по лентам,
+# а дочитываются при открытии ленты
+TIMELINE_FANOUT_THRESHOLD = 1000
+
+# Отдавать ленты потоком: шапка страницы сразу, карточки по мере
+# отрисовки (posts.streaming)
+STREAM_FEEDS = False
+
+# Сколько хранится отрисованная карточка поста. Ключ включает версию
+# поста, поэтому устаревшие карточки просто перестают запрашиваться
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Сколько хранится страница ленты для анонимов. Устаревшие страницы
+# сбрасываются событиями (posts.pagecache), срок лишь чистит кэш
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Как часто процесс сбрасывает накопленные счётчики событий в базу, с
+METRICS_FLUSH_INTERVAL = 10
+
+# Загрузки больше этого размера отвергаются, не дойдя до памяти и диска
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Картинки больше стольких пикселей не принимаются (по заголовку),
+# а со стороной больше IMAGE_MAX_SIDE уменьшаются (None — не уменьшать)
+IMAGE_MAX_PIXELS = 50 * 10**6
+# PNG и WebP при уменьшении декодируются целиком (draft есть только
+# у JPEG), поэтому для них предел ниже: 16 Мпикс RGBA — около 64 МБ
+IMAGE_MAX_DECODED_PIXELS = 16 * 10**6
+IMAGE_MAX_SIDE = 2560
+
+# Превью картинок режутся в фоне (posts.images): столько потоков
+# в каждом веб-процессе, 0 — только командой process_images
+IMAGE_WORKERS = 2
+# Через сколько секунд задание зависшего обработчика вернётся в очередь
+IMAGE_JOB_TIMEOUT = 5 * 60
+# Сколько раз пробовать нарезать превью, прежде чем сдаться
+IMAGE_JOB_ATTEMPTS = 3
+
+# Кэш общий для всех воркеров: файлы в CACHE_DIR, add и incr атомарны
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'posts.caching.SharedFileCache',
+        'LOCATION': CACHE_DIR,
+        # Карточки (по одной на версию поста и автора) и страницы лент
+        # в умолчательные 300 записей не влезают. Заполненный кэш
+        # вытесняет десятую часть записей, а не треть
+        'OPTIONS': {'MAX_ENTRIES': 100000, 'CULL_FREQUENCY': 10},
+    },
 }
+# Кэш, через который ленты считаются с защитой от давки
+SHARED_CACHE_ALIAS = 'default'
+
+# Тесты работают со своим временным кэшем, а не с кэшем сайта
+TEST_RUNNER = 'yatube.test_runner.TestRunner'
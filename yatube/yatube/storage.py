@@ -0,0 +1,91 @@
+"""
+Хранилище статики: имена с хешем содержимого и заранее сжатые копии.
+
+collectstatic кладёт рядом с каждым текстовым файлом name.gz и,
+если установлен пакет brotli, name.br. FileServingMiddleware
+(yatube.middleware) отдаёт сжатую копию тем, кто её принимает,
+и не сжимает ничего на лету.
+"""
+import gzip
+import re
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Что имеет смысл сжимать: картинки и шрифты уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.txt', '.html', '.json',
+                '.xml', '.ico', '.eot', '.ttf', '.otf')
+# Мелкие файлы и файлы, которые сжались меньше чем на 5%, не сжимаем
+MIN_SIZE = 256
+MIN_RATIO = 0.95
+# Имя с хешем: bootstrap.min.1a2b3c4d5e6f.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def is_hashed(name):
+    return HASHED_NAME.search(name) is not None
+
+
+def gzip_bytes(content):
+    """
+    Сжатие gzip без даты в заголовке: одинаковый файл даёт одинаковый
+    архив. gzip.compress принимает mtime только с Python 3.8.
+    """
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                       mtime=0) as archive:
+        archive.write(content)
+    return buffer.getvalue()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Файл, которого нет в манифесте (статику ещё не собирали),
+    # отдаётся по исходному имени, а не роняет {% static %}
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+        if dry_run:
+            return
+        for name in sorted(filter(None, names)):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла; возвращает их имена."""
+        if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+            return []
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < MIN_SIZE:
+            return []
+        variants = [('.gz', gzip_bytes(content))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        written = []
+        for suffix, data in variants:
+            if len(data) > len(content) * MIN_RATIO:
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(data))
+            written.append(target)
+        return written
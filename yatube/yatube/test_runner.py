@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def isolated_caches(location):
+    """Те же кэши, что в настройках, но с файлами во временной папке."""
+    return {
+        alias: dict(params, LOCATION=os.path.join(location, alias))
+        for alias, params in settings.CACHES.items()
+    }
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp()
+        # Превью в тестах режутся явно через posts.images.drain,
+        # счётчики событий сбрасываются в базу только через metrics.get
+        self.cache_settings = override_settings(
+            CACHES=isolated_caches(self.cache_dir), IMAGE_WORKERS=0,
+            METRICS_FLUSH_INTERVAL=float('inf'))
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)